@@ -25,6 +25,9 @@ class GreenAmptInfiltrationAlgorithm(QgsProcessingAlgorithm):
     INITIAL_SATURATION_FIELD = 'INITIAL_SATURATION_FIELD'
     PERCENT_IMPERVIOUS_FIELD = 'PERCENT_IMPERVIOUS_FIELD'
 
+    # Number of output features buffered per sink.addFeatures() call
+    SINK_BATCH_SIZE = 1000
+
     def initAlgorithm(self, config=None):
         self.addParameter(QgsProcessingParameterFeatureSource(self.INPUT_SOILS, 'Input soils layer', [QgsProcessing.TypeVectorAnyGeometry]))
         self.addParameter(QgsProcessingParameterFeatureSource(self.INPUT_LANDUSE, 'Input land use layer', [QgsProcessing.TypeVectorAnyGeometry]))
@@ -85,26 +88,40 @@ class GreenAmptInfiltrationAlgorithm(QgsProcessingAlgorithm):
             total_imprv_idx = union_layer.fields().indexFromName("TotalImprv")
             lu_soil_id_idx = union_layer.fields().indexFromName("LU_Soil_ID")
 
+            # Resolve input field indexes once instead of looking names up per feature
+            fields = union_layer.fields()
+            initial_saturation_idx = fields.lookupField(initial_saturation_field)
+            wilting_point_idx = fields.lookupField(wilting_point_field)
+            saturated_content_idx = fields.lookupField(saturated_content_field)
+            field_capacity_idx = fields.lookupField(field_capacity_field)
+            percent_impervious_idx = fields.lookupField(percent_impervious_field)
+            rock_outcrop_idx = fields.lookupField(rock_outcrop_field)
+            landuse_type_idx = fields.lookupField(landuse_type_field)
+            soil_id_idx = fields.lookupField(soil_id_field)
+            hydraulic_conductivity_idx = fields.lookupField(hydraulic_conductivity_field)
+            capillary_suction_idx = fields.lookupField(capillary_suction_field)
+
             # Calculate new field values
             feedback.pushInfo('Calculating field values...')
             union_layer.startEditing()
             feature_count = union_layer.featureCount()
+            last_pct = -1
             for current, feature in enumerate(union_layer.getFeatures()):
                 if feedback.isCanceled():
                     break
 
                 # Calculate IniWatCont
-                initial_saturation = feature[initial_saturation_field]
+                initial_saturation = feature.attribute(initial_saturation_idx)
                 if initial_saturation == "dry":
-                    ini_wat_cont = feature[wilting_point_field]
+                    ini_wat_cont = feature.attribute(wilting_point_idx)
                 elif initial_saturation == "saturated":
-                    ini_wat_cont = feature[saturated_content_field]
+                    ini_wat_cont = feature.attribute(saturated_content_idx)
                 else:  # "normal"
-                    ini_wat_cont = feature[field_capacity_field]
+                    ini_wat_cont = feature.attribute(field_capacity_idx)
 
                 # Calculate TotalImprv
-                percent_impervious = feature[percent_impervious_field]
-                rock_outcrop = feature[rock_outcrop_field]
+                percent_impervious = feature.attribute(percent_impervious_idx)
+                rock_outcrop = feature.attribute(rock_outcrop_idx)
                 
                 # Handle null values
                 if percent_impervious is None:
@@ -117,15 +134,18 @@ class GreenAmptInfiltrationAlgorithm(QgsProcessingAlgorithm):
                 total_imprv = min(percent_impervious + rock_outcrop, 100)
 
                 # Calculate LU_Soil_ID
-                lu_soil_id = f"{feature[landuse_type_field]}: {feature[soil_id_field]}"
+                lu_soil_id = f"{feature.attribute(landuse_type_idx)}: {feature.attribute(soil_id_idx)}"
 
                 # Update feature
                 union_layer.changeAttributeValue(feature.id(), ini_wat_cont_idx, ini_wat_cont)
                 union_layer.changeAttributeValue(feature.id(), total_imprv_idx, total_imprv)
                 union_layer.changeAttributeValue(feature.id(), lu_soil_id_idx, lu_soil_id)
 
-                # Update progress
-                feedback.setProgress(int(current / feature_count * 100))
+                # Update progress only when the integer percentage changes
+                pct = int(current / feature_count * 100)
+                if pct != last_pct:
+                    feedback.setProgress(pct)
+                    last_pct = pct
 
             union_layer.commitChanges()
 
@@ -137,11 +157,16 @@ class GreenAmptInfiltrationAlgorithm(QgsProcessingAlgorithm):
                 raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
 
             feedback.pushInfo('Saving output layer...')
-            features = union_layer.getFeatures()
-            for feature in features:
+            batch = []
+            for feature in union_layer.getFeatures():
                 if feedback.isCanceled():
                     break
-                sink.addFeature(feature, QgsFeatureSink.FastInsert)
+                batch.append(feature)
+                if len(batch) >= self.SINK_BATCH_SIZE:
+                    sink.addFeatures(batch, QgsFeatureSink.FastInsert)
+                    batch = []
+            if batch and not feedback.isCanceled():
+                sink.addFeatures(batch, QgsFeatureSink.FastInsert)
 
             # Create CSV output
             feedback.pushInfo('Creating CSV output...')
@@ -150,14 +175,14 @@ class GreenAmptInfiltrationAlgorithm(QgsProcessingAlgorithm):
             for feature in union_layer.getFeatures():
                 if feedback.isCanceled():
                     break
-                lu_soil_id = feature["LU_Soil_ID"]
+                lu_soil_id = feature.attribute(lu_soil_id_idx)
                 if lu_soil_id not in unique_rows:
                     unique_rows[lu_soil_id] = {
                         "LU_Soil_ID": lu_soil_id,
-                        "IniWatCont": feature["IniWatCont"],
-                        "Hydraulic Conductivity": feature[hydraulic_conductivity_field],
-                        "Saturated Content": feature[saturated_content_field],
-                        "Capillary Suction": feature[capillary_suction_field]
+                        "IniWatCont": feature.attribute(ini_wat_cont_idx),
+                        "Hydraulic Conductivity": feature.attribute(hydraulic_conductivity_idx),
+                        "Saturated Content": feature.attribute(saturated_content_idx),
+                        "Capillary Suction": feature.attribute(capillary_suction_idx)
                     }
 
             # Write CSV
@@ -7,6 +7,7 @@ from qgis.core import (
     QgsCoordinateTransform, QgsRaster
 )
 from PyQt5.QtCore import QVariant
+from osgeo import gdal
 import math
 
 class SampleRasterAtLineEndpoints(QgsProcessingAlgorithm):
@@ -69,10 +70,12 @@ class SampleRasterAtLineEndpoints(QgsProcessingAlgorithm):
                 raise QgsProcessingException(self.tr('Could not start an edit session on the layer.'))
             started_edit = True
 
-        # Ensure fields exist
-        for name in ('StartVal','EndVal','Slope','Length'):
+        # Ensure fields exist. Elevations get a compact fixed width (halves their DBF
+        # columns vs. the 24.15 default); Slope and Length keep full double precision,
+        # since Length is in layer units and may be degrees or very large.
+        for name, length, prec in (('StartVal', 12, 4), ('EndVal', 12, 4), ('Slope', 0, 0), ('Length', 0, 0)):
             if line_layer.fields().indexFromName(name) == -1:
-                if not prov.addAttributes([QgsField(name, QVariant.Double)]):
+                if not prov.addAttributes([QgsField(name, QVariant.Double, 'double', length, prec)]):
                     if started_edit: line_layer.rollBack()
                     raise QgsProcessingException(self.tr('Failed to add required fields.'))
         line_layer.updateFields()
@@ -96,10 +99,14 @@ class SampleRasterAtLineEndpoints(QgsProcessingAlgorithm):
         except Exception:
             nudge_step = None
 
+        # Direct GDAL reader (bypasses the QGIS provider stack); None -> identify() fallback
+        sampler = self._open_gdal_sampler(raster_layer, band)
+
         line_layer.beginEditCommand(self.tr('Sample DEM at endpoints'))
 
         total = line_layer.featureCount() or 0
         processed = 0
+        report_every = max(1, total // 100)  # progress only changes ~100 times
 
         for feat in line_layer.getFeatures():
             if feedback.isCanceled(): break
@@ -107,7 +114,9 @@ class SampleRasterAtLineEndpoints(QgsProcessingAlgorithm):
             geom = feat.geometry()
             if not geom or geom.isEmpty():
                 self._apply_attrs(line_layer, feat, idx_start, idx_end, idx_slope, idx_len, None, None, None, None, feedback)
-                processed += 1; feedback.setProgress(100.0 * processed / max(total,1)); continue
+                processed += 1
+                if processed % report_every == 0: feedback.setProgress(100.0 * processed / max(total,1))
+                continue
 
             try:
                 if not geom.isGeosValid(): geom = geom.makeValid()
@@ -118,7 +127,9 @@ class SampleRasterAtLineEndpoints(QgsProcessingAlgorithm):
             start_pt, end_pt = self._robust_endpoints(geom)
             if start_pt is None or end_pt is None:
                 self._apply_attrs(line_layer, feat, idx_start, idx_end, idx_slope, idx_len, None, None, None, None, feedback)
-                processed += 1; feedback.setProgress(100.0 * processed / max(total,1)); continue
+                processed += 1
+                if processed % report_every == 0: feedback.setProgress(100.0 * processed / max(total,1))
+                continue
 
             # Transform to raster CRS and sample (with nudge fallback)
             try:
@@ -127,15 +138,15 @@ class SampleRasterAtLineEndpoints(QgsProcessingAlgorithm):
             except Exception:
                 s_r, e_r = None, None
 
-            start_val = self._sample_value(raster_layer, s_r, band)
+            start_val = self._sample_value(raster_layer, s_r, band, sampler)
             if start_val is None and s_r and e_r and nudge_step:
                 s_r = self._nudge_toward(s_r, e_r, nudge_step)
-                start_val = self._sample_value(raster_layer, s_r, band)
+                start_val = self._sample_value(raster_layer, s_r, band, sampler)
 
-            end_val = self._sample_value(raster_layer, e_r, band)
+            end_val = self._sample_value(raster_layer, e_r, band, sampler)
             if end_val is None and s_r and e_r and nudge_step:
                 e_r = self._nudge_toward(e_r, s_r, nudge_step)
-                end_val = self._sample_value(raster_layer, e_r, band)
+                end_val = self._sample_value(raster_layer, e_r, band, sampler)
 
             if start_val is not None: start_val *= vert_factor
             if end_val   is not None: end_val   *= vert_factor
@@ -157,7 +168,11 @@ class SampleRasterAtLineEndpoints(QgsProcessingAlgorithm):
                 feedback.pushInfo(f"Feat {feat.id()} | s={start_val}, e={end_val}, L={length}, slope={slope}")
 
             processed += 1
-            if total: feedback.setProgress(100.0 * processed / total)
+            if total and processed % report_every == 0: feedback.setProgress(100.0 * processed / total)
+
+        # The throttled updates above can stop short of the last feature
+        if not feedback.isCanceled():
+            feedback.setProgress(100)
 
         line_layer.endEditCommand()
 
@@ -185,14 +200,9 @@ class SampleRasterAtLineEndpoints(QgsProcessingAlgorithm):
             ok = False
         if not ok:
             try:
-                f2 = feat
-                attrs = f2.attributes()
-                if i_s >= 0: attrs[i_s] = sv
-                if i_e >= 0: attrs[i_e] = ev
-                if i_m >= 0: attrs[i_m] = sl
-                if i_l >= 0: attrs[i_l] = ln
-                f2.setAttributes(attrs)
-                if not layer.updateFeature(f2):
+                # Only the four sampled fields change; no full attribute-vector copy
+                new_vals = {i: v for i, v in ((i_s, sv), (i_e, ev), (i_m, sl), (i_l, ln)) if i >= 0}
+                if not layer.changeAttributeValues(feat.id(), new_vals):
                     feedback.pushInfo(f"Write failed on FID {feat.id()} (both paths).")
             except Exception:
                 feedback.pushInfo(f"Write exception on FID {feat.id()}.")
@@ -221,9 +231,35 @@ class SampleRasterAtLineEndpoints(QgsProcessingAlgorithm):
         except Exception:
             return p_from
 
-    def _sample_value(self, raster_layer, point_xy, band):
+    def _open_gdal_sampler(self, raster_layer, band):
+        try:
+            if raster_layer.providerType() != 'gdal': return None
+            ds = gdal.Open(raster_layer.source())
+            if ds is None: return None
+            inv_gt = gdal.InvGeoTransform(ds.GetGeoTransform())
+            if inv_gt is None: return None
+            band_obj = ds.GetRasterBand(band)
+            if band_obj is None: return None
+            return {'ds': ds, 'band': band_obj, 'inv_gt': inv_gt, 'ndv': band_obj.GetNoDataValue(),
+                    'xsize': ds.RasterXSize, 'ysize': ds.RasterYSize}
+        except Exception:
+            return None
+
+    def _sample_gdal(self, sampler, point_xy):
+        px, py = gdal.ApplyGeoTransform(sampler['inv_gt'], point_xy.x(), point_xy.y())
+        col, row = int(math.floor(px)), int(math.floor(py))
+        if col < 0 or row < 0 or col >= sampler['xsize'] or row >= sampler['ysize']: return None
+        val = float(sampler['band'].ReadAsArray(col, row, 1, 1)[0, 0])
+        ndv = sampler['ndv']
+        if ndv is not None and val == ndv: return None
+        if math.isnan(val): return None
+        return val
+
+    def _sample_value(self, raster_layer, point_xy, band, sampler=None):
         try:
             if point_xy is None: return None
+            if sampler is not None:
+                return self._sample_gdal(sampler, point_xy)
             provider = raster_layer.dataProvider()
             ident = provider.identify(point_xy, QgsRaster.IdentifyFormatValue)
             if not ident.isValid(): return None
@@ -24,10 +24,12 @@ from qgis.core import (QgsProcessing,
                        QgsProcessingParameterFileDestination,
                        QgsProcessingParameterBoolean,
                        QgsProcessingException,
-                       QgsProcessingUtils,
                        QgsVectorLayer,
                        QgsFeature,
+                       QgsFeatureSink,
+                       QgsFeatureRequest,
                        QgsGeometry,
+                       QgsLineString,
                        QgsField,
                        QgsFields,
                        QgsWkbTypes,
@@ -35,12 +37,19 @@ from qgis.core import (QgsProcessing,
                        QgsCoordinateTransform,
                        QgsProject)
 from qgis.PyQt.QtCore import QVariant
-import processing
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
+import hashlib
+import math
+import time
 import tempfile
 import os
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from xml.etree import ElementTree as ET
+from osgeo import gdal, ogr
 
 
 class SSURGODownloaderAlgorithm(QgsProcessingAlgorithm):
@@ -53,6 +62,40 @@ class SSURGODownloaderAlgorithm(QgsProcessingAlgorithm):
     OUTPUT_SOILS = 'OUTPUT_SOILS'
     OUTPUT_MAP = 'OUTPUT_MAP'
     ADD_TO_CANVAS = 'ADD_TO_CANVAS'
+    USE_CACHE = 'USE_CACHE'
+
+    # Number of output features buffered per sink.addFeatures() call
+    SINK_BATCH_SIZE = 1000
+
+    WFS_URL = 'https://sdmdataaccess.nrcs.usda.gov/Spatial/SDMWGS84Geographic.wfs'
+    # Bounding boxes wider/taller than this (degrees) are split into tiles
+    # that are fetched in parallel
+    WFS_TILE_SIZE = 0.05
+    WFS_MAX_TILES_PER_AXIS = 4
+    WFS_WORKERS = 8
+    # Cleared for the rest of a run once the WFS rejects GeoJSON output
+    wfs_json_supported = True
+    
+    SDA_URL = 'https://sdmdataaccess.nrcs.usda.gov/Tabular/post.rest'
+    # Map unit keys per SDA query and number of concurrent queries
+    SDA_CHUNK_SIZE = 500
+    SDA_WORKERS = 4
+    
+    # Maps with more polygons than this are rasterized instead of drawn as
+    # vector paths; RASTER_MAP_WIDTH is the raster width in pixels
+    RASTER_MAP_THRESHOLD = 2000
+    RASTER_MAP_WIDTH = 2400
+    
+    # WFS bounding boxes are expanded outward to this grid (degrees, ~1 km)
+    # so nearby AOIs request, and cache, identical extents
+    BBOX_SNAP = 0.01
+    
+    # QgsCoordinateTransform objects reused across runs, keyed by CRS pair
+    _transform_cache = {}
+    
+    # Cached WFS/SDA responses older than this (seconds) are downloaded again
+    CACHE_TTL = 30 * 86400
+    CACHE_DIR = os.path.join(tempfile.gettempdir(), 'ssurgo_cache')
 
     def tr(self, string):
         """
@@ -113,6 +156,9 @@ class SSURGODownloaderAlgorithm(QgsProcessingAlgorithm):
         <b>Output Map:</b> PNG file showing soils colored by hydrologic 
         soil group classification.
         
+        <b>Use cached downloads:</b> Reuse WFS/SDA responses saved by 
+        earlier runs for the same area (kept for 30 days).
+        
         <b>Hydrologic Soil Groups:</b>
         - A: Low runoff potential, high infiltration
         - B: Moderate infiltration rate
@@ -163,12 +209,510 @@ class SSURGODownloaderAlgorithm(QgsProcessingAlgorithm):
                 defaultValue=True
             )
         )
+        
+        # Response cache option
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.USE_CACHE,
+                self.tr('Use cached downloads'),
+                defaultValue=True
+            )
+        )
+
+    def create_session(self):
+        """
+        Returns a requests session with pooled keep-alive connections and
+        retry/backoff for transient NRCS server errors.
+        """
+        session = requests.Session()
+        retry = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[502, 503, 504],
+            allowed_methods=frozenset(['GET', 'POST'])  # SDA queries are read-only
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry)
+        session.mount('https://', adapter)
+        session.headers['Accept-Encoding'] = 'gzip, deflate'
+        return session
+
+    def split_bbox(self, minx, miny, maxx, maxy):
+        """
+        Splits a bounding box into an NxM grid of sub-boxes no larger than
+        WFS_TILE_SIZE degrees per side (capped at WFS_MAX_TILES_PER_AXIS).
+        """
+        nx = min(max(1, math.ceil((maxx - minx) / self.WFS_TILE_SIZE)), self.WFS_MAX_TILES_PER_AXIS)
+        ny = min(max(1, math.ceil((maxy - miny) / self.WFS_TILE_SIZE)), self.WFS_MAX_TILES_PER_AXIS)
+        dx = (maxx - minx) / nx
+        dy = (maxy - miny) / ny
+        tiles = []
+        for i in range(nx):
+            for j in range(ny):
+                tiles.append((minx + i * dx, miny + j * dy,
+                              maxx if i == nx - 1 else minx + (i + 1) * dx,
+                              maxy if j == ny - 1 else miny + (j + 1) * dy))
+        return tiles
+
+    def coordinate_transform(self, src_crs, dst_crs, context):
+        """
+        Returns a cached transform between two CRS so the PROJ pipeline is
+        only looked up once per QGIS session.
+        """
+        key = (src_crs.authid() or src_crs.toWkt(), dst_crs.authid() or dst_crs.toWkt())
+        transform = SSURGODownloaderAlgorithm._transform_cache.get(key)
+        if transform is None:
+            transform = QgsCoordinateTransform(src_crs, dst_crs, context.transformContext())
+            SSURGODownloaderAlgorithm._transform_cache[key] = transform
+        return transform
+
+    def output_fields(self):
+        """
+        Returns the fields of the output soils layer.
+        """
+        fields = QgsFields()
+        fields.append(QgsField('mukey', QVariant.String))
+        fields.append(QgsField('musym', QVariant.String))
+        fields.append(QgsField('muname', QVariant.String))
+        fields.append(QgsField('compname', QVariant.String))
+        fields.append(QgsField('comppct_r', QVariant.Double))
+        fields.append(QgsField('hydgrp', QVariant.String))
+        return fields
+
+    def empty_output(self, parameters, context, crs):
+        """
+        Creates the output soils sink without features, for AOIs with no
+        SSURGO coverage, and returns the algorithm result.
+        """
+        (sink, dest_id) = self.parameterAsSink(
+            parameters,
+            self.OUTPUT_SOILS,
+            context,
+            self.output_fields(),
+            QgsWkbTypes.MultiPolygon,
+            crs
+        )
+        
+        if sink is None:
+            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT_SOILS))
+        
+        return {self.OUTPUT_SOILS: dest_id}
+
+    def cache_path(self, prefix, key):
+        """
+        Returns the cache file path (without extension) for a request key.
+        """
+        return os.path.join(self.CACHE_DIR, f'{prefix}_{hashlib.sha1(key.encode()).hexdigest()}')
+
+    def cached_file(self, path):
+        """
+        Returns path if it exists and is younger than CACHE_TTL, else None.
+        """
+        try:
+            if time.time() - os.path.getmtime(path) < self.CACHE_TTL:
+                return path
+        except OSError:
+            pass
+        return None
+
+    def save_response(self, response, suffix, cache_path, first_chunk=b''):
+        """
+        Streams a response body to the cache (when enabled and the server
+        allows storing it) or to a temporary file, one chunk at a time.
+        first_chunk holds bytes already read from the stream by the caller.
+        Temporary files are listed in self.temp_files for remove_temp_files().
+        Returns (path, bytes written).
+        """
+        if cache_path and self.storable(response):
+            os.makedirs(self.CACHE_DIR, exist_ok=True)
+            path = cache_path + suffix
+            f = open(path + '.part', 'wb')
+        else:
+            path = None
+            f = tempfile.NamedTemporaryFile(delete=False, suffix=suffix, mode='wb')
+            self.temp_files.append(f.name)
+        
+        with f:
+            f.write(first_chunk)
+            size = len(first_chunk)
+            for chunk in response.iter_content(chunk_size=65536):
+                f.write(chunk)
+                size += len(chunk)
+        
+        if path is None:
+            return f.name, size
+        os.replace(path + '.part', path)
+        return path, size
+
+    def storable(self, response):
+        """
+        Returns True unless the server marked the response Cache-Control: no-store.
+        """
+        return 'no-store' not in response.headers.get('Cache-Control', '')
+
+    def remove_temp_files(self):
+        """
+        Deletes the temporary download files of this run. Callers release
+        any layers reading them first.
+        """
+        while self.temp_files:
+            try:
+                os.remove(self.temp_files.pop())
+            except OSError:
+                pass
+
+    def fetch_wfs_tile(self, session, bbox, use_cache=False):
+        """
+        Requests the MapUnitPoly features for one bounding box and saves them
+        to a temporary file. GeoJSON is requested first since OGR parses it
+        much faster than GML; servers that reject it get GML2 instead.
+        Returns (path, bytes downloaded); cache hits report 0 bytes.
+        """
+        cache_path = None
+        if use_cache:
+            cache_path = self.cache_path('wfs', 'MapUnitPoly_{:.4f}_{:.4f}_{:.4f}_{:.4f}'.format(*bbox))
+            for suffix in ('.geojson', '.gml'):
+                cached = self.cached_file(cache_path + suffix)
+                if cached:
+                    return cached, 0
+        
+        params = {
+            'SERVICE': 'WFS',
+            'VERSION': '1.0.0',
+            'REQUEST': 'GetFeature',
+            'TYPENAME': 'MapUnitPoly',
+            'BBOX': '{},{},{},{}'.format(*bbox)
+        }
+        
+        if self.wfs_json_supported:
+            with session.get(self.WFS_URL, params=dict(params, outputFormat='application/json'),
+                             timeout=180, stream=True) as response:
+                if response.status_code >= 500:
+                    raise QgsProcessingException(f'WFS request failed with status {response.status_code}')
+                # MapServer reports unsupported formats as a 200 XML exception;
+                # any other non-JSON reply only sends this tile to GML
+                first_chunk = next(response.iter_content(chunk_size=65536), b'')
+                if response.status_code == 200 and first_chunk.lstrip()[:1] == b'{':
+                    return self.save_response(response, '.geojson', cache_path, first_chunk)
+                if response.status_code == 400 or b'outputformat' in first_chunk.lower():
+                    self.wfs_json_supported = False
+        
+        with session.get(self.WFS_URL, params=dict(params, outputFormat='GML2'),
+                         timeout=180, stream=True) as response:
+            if response.status_code != 200:
+                raise QgsProcessingException(f'WFS request failed with status {response.status_code}')
+            
+            return self.save_response(response, '.gml', cache_path)
+
+    def fix_invalid_geometries(self, layer, feedback):
+        """
+        Repairs only the invalid polygons in the layer. Most SSURGO polygons
+        are already valid, so a layer without invalid geometries is returned
+        untouched; otherwise it is copied to a memory layer (if needed) and
+        just the invalid features are run through makeValid().
+        """
+        invalid_ids = [f.id() for f in layer.getFeatures(QgsFeatureRequest().setNoAttributes())
+                       if not f.geometry().isGeosValid()]
+        
+        if not invalid_ids:
+            feedback.pushInfo('All geometries are valid')
+            return layer
+        
+        if layer.dataProvider().name() != 'memory':
+            fields = layer.fields()
+            memory_layer = QgsVectorLayer('MultiPolygon?crs=EPSG:4326', 'ssurgo_temp', 'memory')
+            memory_layer.dataProvider().addAttributes(fields.toList())
+            memory_layer.updateFields()
+            invalid_ids = set(invalid_ids)
+            features = []
+            new_invalid_ids = []
+            for feature in layer.getFeatures():
+                if feature.id() in invalid_ids:
+                    new_invalid_ids.append(len(features))
+                out_feature = QgsFeature(memory_layer.fields())
+                out_feature.setGeometry(feature.geometry())
+                out_feature.setAttributes(feature.attributes())
+                features.append(out_feature)
+            _, added = memory_layer.dataProvider().addFeatures(features)
+            invalid_ids = [added[i].id() for i in new_invalid_ids]
+            layer = memory_layer
+        
+        fixed = {}
+        dropped = []
+        for feature in layer.getFeatures(QgsFeatureRequest().setFilterFids(invalid_ids).setNoAttributes()):
+            geom = feature.geometry().makeValid()
+            # makeValid can emit a collection; keep only the polygon parts
+            if geom.type() != QgsWkbTypes.PolygonGeometry:
+                geom = geom.convertToType(QgsWkbTypes.PolygonGeometry, True)
+            # convertToType returns a null geometry when no polygon part survives
+            if geom.isNull() or geom.isEmpty():
+                dropped.append(feature.id())
+                continue
+            geom.convertToMultiType()
+            fixed[feature.id()] = geom
+        layer.dataProvider().changeGeometryValues(fixed)
+        
+        feedback.pushInfo(f'Fixed {len(fixed)} of {len(invalid_ids)} invalid geometries')
+        if dropped:
+            layer.dataProvider().deleteFeatures(dropped)
+            feedback.pushWarning(f'Dropped {len(dropped)} polygon(s) with no valid polygon area')
+        return layer
+
+    def clip_to_aoi(self, layer, aoi_geom):
+        """
+        Clips the soil polygons to the AOI using a prepared GEOS engine.
+        Polygons wholly inside the AOI are kept as-is and only those crossing
+        the boundary are intersected. Returns a list of features.
+        """
+        engine = QgsGeometry.createGeometryEngine(aoi_geom.constGet())
+        engine.prepareGeometry()
+        
+        clipped = []
+        for feature in layer.getFeatures(QgsFeatureRequest().setFilterRect(aoi_geom.boundingBox())):
+            geom = feature.geometry()
+            if engine.contains(geom.constGet()):
+                clipped.append(feature)
+                continue
+            if not engine.intersects(geom.constGet()):
+                continue
+            
+            part = QgsGeometry(engine.intersection(geom.constGet()))
+            # Polygons touching the AOI edge can yield lines/points; keep polygon parts only
+            if QgsWkbTypes.flatType(part.wkbType()) == QgsWkbTypes.GeometryCollection:
+                part = QgsGeometry.collectGeometry([g for g in part.asGeometryCollection()
+                                                    if g.type() == QgsWkbTypes.PolygonGeometry])
+            if part.isEmpty() or part.type() != QgsWkbTypes.PolygonGeometry:
+                continue
+            part.convertToMultiType()
+            feature.setGeometry(part)
+            clipped.append(feature)
+        
+        return clipped
+
+    def parse_gml(self, path):
+        """
+        Streams a WFS GML2 MapUnitPoly response into a memory layer with
+        iterparse, skipping the OGR GML driver's schema discovery pass.
+        All attributes are read as strings. MapServer returns errors as a
+        200 ServiceExceptionReport, which raises QgsProcessingException
+        rather than parsing as an empty layer.
+        """
+        gml = '{http://www.opengis.net/gml}'
+        rows = []
+        names = []
+        root = None
+        
+        # Own the file handle so it is closed even when parsing raises
+        with open(path, 'rb') as f:
+            for event, elem in ET.iterparse(f, events=('start', 'end')):
+                if root is None:
+                    root = elem.tag.split('}')[-1]
+                    if root in ('ServiceExceptionReport', 'ExceptionReport'):
+                        message = ' '.join(' '.join(ET.parse(path).getroot().itertext()).split())
+                        raise QgsProcessingException(f'WFS service exception: {message}')
+                    if root != 'FeatureCollection':
+                        raise QgsProcessingException(f'Unexpected WFS response: <{root}> document')
+                if event != 'end' or elem.tag != gml + 'featureMember':
+                    continue
+                
+                attrs = {}
+                polygons = []
+                for child in list(elem)[0]:
+                    if child.tag == gml + 'boundedBy':
+                        continue
+                    polygon_elems = list(child.iter(gml + 'Polygon'))
+                    if not polygon_elems:
+                        attrs[child.tag.split('}')[-1]] = child.text
+                        continue
+                    for polygon in polygon_elems:
+                        rings = []
+                        for coords in polygon.iter(gml + 'coordinates'):
+                            # GML2 coordinates are "x,y x,y ..."
+                            rings.append('(' + ', '.join(c.replace(',', ' ') for c in coords.text.split()) + ')')
+                        polygons.append('(' + ', '.join(rings) + ')')
+                elem.clear()
+                
+                if not polygons:
+                    continue
+                for name in attrs:
+                    if name not in names:
+                        names.append(name)
+                rows.append((attrs, 'MULTIPOLYGON(' + ', '.join(polygons) + ')'))
+        
+        layer = QgsVectorLayer('MultiPolygon?crs=EPSG:4326', 'ssurgo_temp', 'memory')
+        layer.dataProvider().addAttributes([QgsField(name, QVariant.String) for name in names])
+        layer.updateFields()
+        
+        features = []
+        for attrs, wkt in rows:
+            feature = QgsFeature(layer.fields())
+            feature.setGeometry(QgsGeometry.fromWkt(wkt))
+            feature.setAttributes([attrs.get(name) for name in names])
+            features.append(feature)
+        layer.dataProvider().addFeatures(features)
+        layer.updateExtents()
+        return layer
+
+    def load_tile(self, path):
+        """
+        Loads a downloaded WFS tile. GML is parsed directly and falls back to
+        the OGR provider if the document does not have the expected layout.
+        """
+        if path.endswith('.gml'):
+            try:
+                return self.parse_gml(path)
+            except (ET.ParseError, IndexError, AttributeError):
+                pass
+            except QgsProcessingException:
+                # Do not serve a cached error document on the next run
+                if path.startswith(self.CACHE_DIR):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                raise
+        return QgsVectorLayer(path, 'ssurgo_temp', 'ogr')
+
+    def query_sda(self, session, mukeys, use_cache=False):
+        """
+        Queries the major components for a batch of map unit keys from Soil
+        Data Access. Returns (rows, loaded from cache).
+        """
+        sda_cache = self.cache_path('sda', ','.join(mukeys)) + '.json' if use_cache else None
+        
+        if sda_cache and self.cached_file(sda_cache):
+            with open(sda_cache, 'rb') as f:
+                return json.loads(f.read()).get('Table', []), True
+        
+        mukey_str = ','.join([f"'{m}'" for m in mukeys])
+        
+        sql = f"""
+        SELECT 
+            mu.mukey,
+            mu.musym,
+            mu.muname,
+            c.cokey,
+            c.compname,
+            c.comppct_r,
+            c.hydgrp
+        FROM mapunit mu
+        INNER JOIN component c ON mu.mukey = c.mukey
+        WHERE mu.mukey IN ({mukey_str})
+        AND c.majcompflag = 'Yes'
+        ORDER BY mu.mukey, c.comppct_r DESC
+        """
+        
+        response = session.post(self.SDA_URL, data={'query': sql, 'format': 'JSON'}, timeout=60)
+        
+        if response.status_code != 200:
+            raise QgsProcessingException(f'SDA request failed with status {response.status_code}')
+        
+        result = response.json()
+        
+        # Nothing else reads the body, so a no-store response is not written at all
+        if sda_cache and 'Table' in result and self.storable(response):
+            self.save_response(response, '', sda_cache)
+        
+        return result.get('Table', []), False
+
+    def rasterize_classes(self, class_geoms, bounds, width):
+        """
+        Burns lists of geometries into an in-memory GDAL raster covering
+        bounds, using class code i + 1 for class_geoms[i] (0 = no data).
+        Returns the grid as a uint8 NumPy array.
+        """
+        height = max(1, int(round(width * bounds.height() / bounds.width())))
+        
+        vector_ds = ogr.GetDriverByName('Memory').CreateDataSource('')
+        layer = vector_ds.CreateLayer('hsg', geom_type=ogr.wkbMultiPolygon)
+        layer.CreateField(ogr.FieldDefn('cls', ogr.OFTInteger))
+        for code, geoms in enumerate(class_geoms, start=1):
+            for geom in geoms:
+                feature = ogr.Feature(layer.GetLayerDefn())
+                feature.SetField('cls', code)
+                feature.SetGeometry(ogr.CreateGeometryFromWkb(bytes(geom.asWkb())))
+                layer.CreateFeature(feature)
+        
+        raster_ds = gdal.GetDriverByName('MEM').Create('', width, height, 1, gdal.GDT_Byte)
+        raster_ds.SetGeoTransform((bounds.xMinimum(), bounds.width() / width, 0,
+                                   bounds.yMaximum(), 0, -bounds.height() / height))
+        gdal.RasterizeLayer(raster_ds, [1], layer, options=['ATTRIBUTE=cls'])
+        return raster_ds.GetRasterBand(1).ReadAsArray()
+
+    def download_wfs(self, session, bbox, feedback, use_cache=False):
+        """
+        Downloads the soil polygons for the bounding box. Large boxes are
+        fetched as parallel tiles and merged, dropping polygons that were
+        returned by more than one tile. Raises QgsProcessingException if
+        any tile fails to download or parse.
+        """
+        tiles = self.split_bbox(*bbox)
+        
+        if len(tiles) == 1:
+            results = [self.fetch_wfs_tile(session, tiles[0], use_cache)]
+        else:
+            feedback.pushInfo(f'Splitting request into {len(tiles)} tiles...')
+            with ThreadPoolExecutor(max_workers=min(self.WFS_WORKERS, len(tiles))) as executor:
+                results = list(executor.map(lambda tile: self.fetch_wfs_tile(session, tile, use_cache), tiles))
+        
+        data_format = 'GeoJSON' if results[0][0].endswith('.geojson') else 'GML'
+        feedback.pushInfo(f'Downloaded {data_format} data ({sum(size for _, size in results)} bytes)')
+        cache_hits = sum(1 for _, size in results if size == 0)
+        if cache_hits:
+            feedback.pushInfo(f'Loaded {cache_hits} of {len(results)} WFS tile(s) from cache')
+        
+        # Any tile that fails fails the whole download, so a bad tile cannot
+        # leave a hole in the output or pass for missing coverage. Empty
+        # FeatureCollections load as valid layers with no features.
+        tile_layers = []
+        for path, _ in results:
+            layer = self.load_tile(path)
+            if not layer.isValid():
+                raise QgsProcessingException(f'Failed to parse WFS response: {path}')
+            tile_layers.append(layer)
+        
+        if len(tile_layers) == 1:
+            return tile_layers[0]
+        
+        # Merge the tiles into one memory layer (schema from the first non-empty tile)
+        fields = next((l.fields() for l in tile_layers if l.featureCount()), tile_layers[0].fields())
+        merged = QgsVectorLayer('MultiPolygon?crs=EPSG:4326', 'ssurgo_temp', 'memory')
+        merged.dataProvider().addAttributes(fields.toList())
+        merged.updateFields()
+        
+        seen = set()
+        for layer in tile_layers:
+            layer_fields = layer.fields()
+            field_map = [layer_fields.lookupField(f.name()) for f in fields]
+            features = []
+            for feature in layer.getFeatures():
+                geom = feature.geometry()
+                key = bytes(geom.asWkb())
+                if key in seen:
+                    continue
+                seen.add(key)
+                attrs = feature.attributes()
+                geom.convertToMultiType()
+                out_feature = QgsFeature(merged.fields())
+                out_feature.setGeometry(geom)
+                out_feature.setAttributes([attrs[i] if i >= 0 else None for i in field_map])
+                features.append(out_feature)
+            merged.dataProvider().addFeatures(features)
+        
+        merged.updateExtents()
+        return merged
 
     def processAlgorithm(self, parameters, context, feedback):
         """
         Main processing method.
         """
         
+        # One pooled session serves both the WFS and SDA requests
+        session = self.create_session()
+        use_cache = self.parameterAsBool(parameters, self.USE_CACHE, context)
+        # Try GeoJSON again on every run; a past rejection may not apply now
+        self.wfs_json_supported = True
+        self.temp_files = []
+        
         # Get input layer
         aoi_layer = self.parameterAsVectorLayer(
             parameters,
@@ -186,88 +730,56 @@ class SSURGODownloaderAlgorithm(QgsProcessingAlgorithm):
         # Check if we need to reproject to WGS84
         wgs84_crs = QgsCoordinateReferenceSystem('EPSG:4326')
         
+        # Get bounding box (only the extent is transformed; the clip step
+        # reprojects the AOI on the fly)
+        extent = aoi_layer.extent()
+        to_wgs84 = None
+        
         if aoi_layer.crs() != wgs84_crs:
-            feedback.pushInfo('Reprojecting AOI to WGS84...')
-            # Reproject the layer
-            reprojected = processing.run(
-                "native:reprojectlayer",
-                {
-                    'INPUT': aoi_layer,
-                    'TARGET_CRS': wgs84_crs,
-                    'OUTPUT': 'memory:'
-                },
-                context=context,
-                feedback=feedback,
-                is_child_algorithm=True
-            )
-            
-            # Load the reprojected layer properly
-            aoi_layer = QgsProcessingUtils.mapLayerFromString(reprojected['OUTPUT'], context)
+            feedback.pushInfo('Transforming AOI extent to WGS84...')
+            to_wgs84 = self.coordinate_transform(aoi_layer.crs(), wgs84_crs, context)
+            extent = to_wgs84.transformBoundingBox(extent)
+        
+        # Dissolved AOI geometry in WGS84, used to clip the soil polygons
+        aoi_geoms = []
+        for feature in aoi_layer.getFeatures(QgsFeatureRequest().setNoAttributes()):
+            geom = feature.geometry()
+            if to_wgs84 is not None:
+                geom.transform(to_wgs84)
+            aoi_geoms.append(geom)
+        aoi_geom = QgsGeometry.unaryUnion(aoi_geoms)
         
-        # Get bounding box
-        extent = aoi_layer.extent()
         minx, miny, maxx, maxy = extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum()
         
         feedback.pushInfo(f'Bounding box: [{minx:.6f}, {miny:.6f}, {maxx:.6f}, {maxy:.6f}]')
         
+        # Snap outward to the request grid; the clip step trims back to the AOI
+        snap = self.BBOX_SNAP
+        minx, miny = round(math.floor(minx / snap) * snap, 6), round(math.floor(miny / snap) * snap, 6)
+        maxx, maxy = round(math.ceil(maxx / snap) * snap, 6), round(math.ceil(maxy / snap) * snap, 6)
+        feedback.pushInfo(f'Request extent: [{minx:.2f}, {miny:.2f}, {maxx:.2f}, {maxy:.2f}]')
+        
         # Step 1: Download spatial data from WFS
         feedback.pushInfo('\n' + '='*50)
         feedback.pushInfo('DOWNLOADING SPATIAL DATA FROM USDA-NRCS')
         feedback.pushInfo('='*50)
         
-        wfs_url = "https://sdmdataaccess.nrcs.usda.gov/Spatial/SDMWGS84Geographic.wfs"
-        
-        params = {
-            'SERVICE': 'WFS',
-            'VERSION': '1.0.0',
-            'REQUEST': 'GetFeature',
-            'TYPENAME': 'MapUnitPoly',
-            'BBOX': f'{minx},{miny},{maxx},{maxy}',
-            'outputFormat': 'GML2'
-        }
-        
-        feedback.pushInfo(f'WFS URL: {wfs_url}')
+        feedback.pushInfo(f'WFS URL: {self.WFS_URL}')
         feedback.pushInfo('Requesting soil polygons...')
         
         try:
-            response = requests.get(wfs_url, params=params, timeout=180)
-            
-            if response.status_code != 200:
-                raise QgsProcessingException(f'WFS request failed with status {response.status_code}')
-            
-            # Save GML to temporary file
-            temp_gml = tempfile.NamedTemporaryFile(delete=False, suffix='.gml', mode='wb')
-            temp_gml.write(response.content)
-            temp_gml.close()
-            
-            feedback.pushInfo(f'Downloaded GML data ({len(response.content)} bytes)')
-            
-            # Load GML as vector layer
-            gml_layer = QgsVectorLayer(temp_gml.name, 'ssurgo_temp', 'ogr')
-            
-            if not gml_layer.isValid():
-                raise QgsProcessingException('Failed to parse GML response')
+            gml_layer = self.download_wfs(session, (minx, miny, maxx, maxy), feedback, use_cache)
             
             feedback.pushInfo(f'Parsed {gml_layer.featureCount()} soil polygons')
             
+            if gml_layer.featureCount() == 0:
+                feedback.pushWarning('AOI has no SSURGO coverage; writing an empty soils layer')
+                return self.empty_output(parameters, context, wgs84_crs)
+            
             # Fix invalid geometries first
             feedback.pushInfo('Fixing invalid geometries...')
             try:
-                fixed = processing.run(
-                    "native:fixgeometries",
-                    {
-                        'INPUT': gml_layer,
-                        'METHOD': 1,  # Structure method
-                        'OUTPUT': 'memory:'
-                    },
-                    context=context,
-                    feedback=feedback,
-                    is_child_algorithm=True
-                )
-                
-                # Load the fixed layer properly
-                gml_layer = QgsProcessingUtils.mapLayerFromString(fixed['OUTPUT'], context)
-                feedback.pushInfo(f'Geometries validated and fixed')
+                gml_layer = self.fix_invalid_geometries(gml_layer, feedback)
                 
             except Exception as geom_error:
                 feedback.pushWarning(f'Geometry fixing had issues: {str(geom_error)}')
@@ -276,94 +788,49 @@ class SSURGODownloaderAlgorithm(QgsProcessingAlgorithm):
             # Clip to AOI using intersection (more robust than clip)
             feedback.pushInfo('Clipping to AOI boundary...')
             
-            try:
-                # First try intersection
-                clipped = processing.run(
-                    "native:intersection",
-                    {
-                        'INPUT': gml_layer,
-                        'OVERLAY': aoi_layer,
-                        'INPUT_FIELDS': [],  # Keep all fields from input
-                        'OVERLAY_FIELDS': [],  # Don't keep overlay fields
-                        'OVERLAY_FIELDS_PREFIX': '',
-                        'OUTPUT': 'memory:'
-                    },
-                    context=context,
-                    feedback=feedback,
-                    is_child_algorithm=True
-                )
-                
-                # Load the clipped layer properly
-                soils_layer = QgsProcessingUtils.mapLayerFromString(clipped['OUTPUT'], context)
-                
-            except Exception as clip_error:
-                feedback.pushWarning(f'Intersection failed: {str(clip_error)}')
-                feedback.pushInfo('Trying alternative method: extract by location...')
-                
-                # Alternative: use extract by location (less precise but more robust)
-                clipped = processing.run(
-                    "native:extractbylocation",
-                    {
-                        'INPUT': gml_layer,
-                        'PREDICATE': [0],  # intersect
-                        'INTERSECT': aoi_layer,
-                        'OUTPUT': 'memory:'
-                    },
-                    context=context,
-                    feedback=feedback,
-                    is_child_algorithm=True
-                )
-                
-                # Load the layer properly
-                soils_layer = QgsProcessingUtils.mapLayerFromString(clipped['OUTPUT'], context)
+            soils_features = self.clip_to_aoi(gml_layer, aoi_geom)
             
-            feedback.pushInfo(f'Clipped to {soils_layer.featureCount()} polygons')
+            feedback.pushInfo(f'Clipped to {len(soils_features)} polygons')
             
             # Get unique mukeys
-            mukeys = []
-            for feature in soils_layer.getFeatures():
-                mukey = feature['mukey']
-                if mukey not in mukeys:
-                    mukeys.append(mukey)
+            mukey_idx = gml_layer.fields().lookupField('mukey')
+            mukey_counts = Counter(str(feature.attribute(mukey_idx)) for feature in soils_features)
+            mukeys = sorted(mukey_counts)
             
             feedback.pushInfo(f'Unique map units: {len(mukeys)}')
             feedback.pushInfo(f'Map unit keys: {mukeys}')
             
+            if not mukeys:
+                feedback.pushWarning('No soil polygons intersect the AOI; writing an empty soils layer')
+                return self.empty_output(parameters, context, wgs84_crs)
+            
         except Exception as e:
             raise QgsProcessingException(f'Error downloading spatial data: {str(e)}')
         
+        finally:
+            # The clipped features are copies, so the tile files can go now
+            gml_layer = None
+            self.remove_temp_files()
+        
         # Step 2: Download tabular data from SDA
         feedback.pushInfo('\n' + '='*50)
         feedback.pushInfo('DOWNLOADING SOIL ATTRIBUTES')
         feedback.pushInfo('='*50)
         
-        mukey_str = ','.join([f"'{m}'" for m in mukeys])
-        
-        sql = f"""
-        SELECT 
-            mu.mukey,
-            mu.musym,
-            mu.muname,
-            c.cokey,
-            c.compname,
-            c.comppct_r,
-            c.hydgrp
-        FROM mapunit mu
-        INNER JOIN component c ON mu.mukey = c.mukey
-        WHERE mu.mukey IN ({mukey_str})
-        AND c.majcompflag = 'Yes'
-        ORDER BY mu.mukey, c.comppct_r DESC
-        """
-        
-        sda_url = "https://sdmdataaccess.nrcs.usda.gov/Tabular/post.rest"
-        
         try:
-            response = requests.post(sda_url, data={'query': sql, 'format': 'JSON'}, timeout=60)
+            chunks = [mukeys[i:i + self.SDA_CHUNK_SIZE] for i in range(0, len(mukeys), self.SDA_CHUNK_SIZE)]
             
-            if response.status_code != 200:
-                raise QgsProcessingException(f'SDA request failed with status {response.status_code}')
+            if len(chunks) == 1:
+                tables = [self.query_sda(session, chunks[0], use_cache)]
+            else:
+                feedback.pushInfo(f'Querying {len(mukeys)} map units in {len(chunks)} batches...')
+                with ThreadPoolExecutor(max_workers=min(self.SDA_WORKERS, len(chunks))) as executor:
+                    tables = list(executor.map(lambda chunk: self.query_sda(session, chunk, use_cache), chunks))
             
-            result = response.json()
+            cache_hits = sum(1 for _, cached in tables if cached)
+            if cache_hits:
+                feedback.pushInfo(f'Loaded {cache_hits} of {len(tables)} attribute batch(es) from cache')
+            result = {'Table': [row for table, _ in tables for row in table]}
             
             if 'Table' not in result or len(result['Table']) == 0:
                 raise QgsProcessingException('No soil component data returned from SDA')
@@ -380,12 +847,11 @@ class SSURGODownloaderAlgorithm(QgsProcessingAlgorithm):
             
             feedback.pushInfo(f'Retrieved {len(components)} soil components')
             
-            # Get dominant component per map unit
+            # Get dominant component per map unit. The SQL orders rows by
+            # comppct_r DESC within each mukey, so the first row seen wins.
             dominant_components = {}
             for comp in components:
-                mukey = comp['mukey']
-                if mukey not in dominant_components or comp['comppct_r'] > dominant_components[mukey]['comppct_r']:
-                    dominant_components[mukey] = comp
+                dominant_components.setdefault(comp['mukey'], comp)
             
             feedback.pushInfo(f'Identified {len(dominant_components)} dominant components')
             
@@ -402,13 +868,7 @@ class SSURGODownloaderAlgorithm(QgsProcessingAlgorithm):
         feedback.pushInfo('='*50)
         
         # Define output fields
-        fields = QgsFields()
-        fields.append(QgsField('mukey', QVariant.String))
-        fields.append(QgsField('musym', QVariant.String))
-        fields.append(QgsField('muname', QVariant.String))
-        fields.append(QgsField('compname', QVariant.String))
-        fields.append(QgsField('comppct_r', QVariant.Double))
-        fields.append(QgsField('hydgrp', QVariant.String))
+        fields = self.output_fields()
         
         # Get output sink
         (sink, dest_id) = self.parameterAsSink(
@@ -423,29 +883,33 @@ class SSURGODownloaderAlgorithm(QgsProcessingAlgorithm):
         if sink is None:
             raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT_SOILS))
         
-        # Add features to output
-        hsg_counts = {}
-        
-        for feature in soils_layer.getFeatures():
-            mukey = str(feature['mukey'])
+        # Add features to output (buffered, one sink call per batch)
+        batch = []
+        for feature in soils_features:
+            mukey = str(feature.attribute(mukey_idx))
             
             if mukey in dominant_components:
                 comp = dominant_components[mukey]
                 
                 out_feature = QgsFeature(fields)
                 out_feature.setGeometry(feature.geometry())
-                out_feature['mukey'] = mukey
-                out_feature['musym'] = comp['musym']
-                out_feature['muname'] = comp['muname']
-                out_feature['compname'] = comp['compname']
-                out_feature['comppct_r'] = comp['comppct_r']
-                out_feature['hydgrp'] = comp['hydgrp']
-                
-                sink.addFeature(out_feature)
+                # Same order as the output fields defined above
+                out_feature.setAttributes([mukey, comp['musym'], comp['muname'], comp['compname'],
+                                           comp['comppct_r'], comp['hydgrp']])
                 
-                # Count HSG
-                hydgrp = comp['hydgrp']
-                hsg_counts[hydgrp] = hsg_counts.get(hydgrp, 0) + 1
+                batch.append(out_feature)
+                if len(batch) >= self.SINK_BATCH_SIZE:
+                    sink.addFeatures(batch, QgsFeatureSink.FastInsert)
+                    batch = []
+        
+        if batch:
+            sink.addFeatures(batch, QgsFeatureSink.FastInsert)
+        
+        # Count HSG per polygon from the per-mukey polygon counts
+        hsg_counts = Counter()
+        for mukey, count in mukey_counts.items():
+            if mukey in dominant_components:
+                hsg_counts[dominant_components[mukey]['hydgrp']] += count
         
         feedback.pushInfo('Merged spatial and tabular data')
         feedback.pushInfo('\nHydrologic Soil Group Distribution:')
@@ -476,6 +940,9 @@ class SSURGODownloaderAlgorithm(QgsProcessingAlgorithm):
                 matplotlib.use('Agg')  # Use non-interactive backend
                 import matplotlib.pyplot as plt
                 from matplotlib.patches import Patch
+                from matplotlib.collections import PolyCollection, LineCollection
+                from matplotlib.colors import ListedColormap, BoundaryNorm
+                import numpy as np
                 
                 # Create temporary layer from sink
                 temp_layer = QgsVectorLayer(dest_id, 'soils', 'ogr')
@@ -493,74 +960,66 @@ class SSURGODownloaderAlgorithm(QgsProcessingAlgorithm):
                 
                 fig, ax = plt.subplots(figsize=(16, 12))
                 
+                # Group geometries by HSG in a single pass (None/Water features keyed as None)
+                hsg_geoms = defaultdict(list)
+                hsg_request = QgsFeatureRequest().setSubsetOfAttributes(['hydgrp'], temp_layer.fields())
+                for feature in temp_layer.getFeatures(hsg_request):
+                    hydgrp = feature['hydgrp']
+                    hsg_geoms[None if hydgrp is None or hydgrp == 'None' else hydgrp].append(feature.geometry())
+                
+                def fill_geometries(geoms, color):
+                    # Collect every ring as an (N, 2) vertex array and draw them as one artist
+                    rings = []
+                    for geom in geoms:
+                        for polygon in geom.constParts():
+                            for i in range(-1, polygon.numInteriorRings()):
+                                ring = polygon.exteriorRing() if i < 0 else polygon.interiorRing(i)
+                                if not isinstance(ring, QgsLineString):
+                                    ring = ring.curveToLine()
+                                rings.append(np.column_stack((ring.xVector(), ring.yVector())))
+                    if rings:
+                        ax.add_collection(PolyCollection(rings, facecolors=color, edgecolors='black',
+                                                         linewidths=0.5, alpha=0.85))
+                
                 # Plot each HSG (filter out None values for map)
                 legend_handles = []
                 valid_hsgs = sorted([k for k in hsg_counts.keys() if k is not None and k != 'None'])
+                has_water = None in hsg_counts or 'None' in hsg_counts
+                water_color = '#87CEEB'  # Light blue for water/pits
+                
+                if sum(len(geoms) for geoms in hsg_geoms.values()) > self.RASTER_MAP_THRESHOLD:
+                    # Large maps: burn the HSG classes into a grid so drawing cost
+                    # no longer scales with the polygon vertex count
+                    feedback.pushInfo('Rasterizing soils for the map...')
+                    classes = valid_hsgs + ([None] if has_water else [])
+                    class_colors = [colors.get(hsg, '#95A5A6') for hsg in valid_hsgs] + ([water_color] if has_water else [])
+                    bounds = aoi_geom.boundingBox()
+                    grid = self.rasterize_classes([hsg_geoms.get(hsg, []) for hsg in classes], bounds, self.RASTER_MAP_WIDTH)
+                    # uint8 codes map straight to palette entries; code 0 (no data) is transparent
+                    cmap = ListedColormap(['#00000000'] + class_colors)
+                    norm = BoundaryNorm(np.arange(len(classes) + 2) - 0.5, ncolors=cmap.N)
+                    ax.imshow(grid, cmap=cmap, norm=norm, interpolation='nearest', alpha=0.85,
+                              extent=[bounds.xMinimum(), bounds.xMaximum(), bounds.yMinimum(), bounds.yMaximum()])
+                else:
+                    for hsg in valid_hsgs:
+                        fill_geometries(hsg_geoms.get(hsg, []), colors.get(hsg, '#95A5A6'))
+                    if has_water:
+                        fill_geometries(hsg_geoms.get(None, []), water_color)
                 
                 for hsg in valid_hsgs:
-                    color = colors.get(hsg, '#95A5A6')
-                    
-                    # Plot features with this HSG
-                    for feature in temp_layer.getFeatures():
-                        if feature['hydgrp'] == hsg:
-                            geom = feature.geometry()
-                            
-                            # Convert to matplotlib format
-                            if geom.isMultipart():
-                                polygons = geom.asMultiPolygon()
-                                for polygon in polygons:
-                                    for ring in polygon:
-                                        xs = [p.x() for p in ring]
-                                        ys = [p.y() for p in ring]
-                                        ax.fill(xs, ys, color=color, edgecolor='black', linewidth=0.5, alpha=0.85)
-                            else:
-                                polygon = geom.asPolygon()
-                                for ring in polygon:
-                                    xs = [p.x() for p in ring]
-                                    ys = [p.y() for p in ring]
-                                    ax.fill(xs, ys, color=color, edgecolor='black', linewidth=0.5, alpha=0.85)
-                    
-                    legend_handles.append(Patch(facecolor=color, edgecolor='black', label=f'HSG {hsg}'))
+                    legend_handles.append(Patch(facecolor=colors.get(hsg, '#95A5A6'), edgecolor='black', label=f'HSG {hsg}'))
                 
-                # Plot Water/Pits (None HSG) if present
-                if None in hsg_counts or 'None' in hsg_counts:
-                    water_color = '#87CEEB'  # Light blue for water/pits
-                    for feature in temp_layer.getFeatures():
-                        if feature['hydgrp'] is None or feature['hydgrp'] == 'None':
-                            geom = feature.geometry()
-                            
-                            if geom.isMultipart():
-                                polygons = geom.asMultiPolygon()
-                                for polygon in polygons:
-                                    for ring in polygon:
-                                        xs = [p.x() for p in ring]
-                                        ys = [p.y() for p in ring]
-                                        ax.fill(xs, ys, color=water_color, edgecolor='black', linewidth=0.5, alpha=0.85)
-                            else:
-                                polygon = geom.asPolygon()
-                                for ring in polygon:
-                                    xs = [p.x() for p in ring]
-                                    ys = [p.y() for p in ring]
-                                    ax.fill(xs, ys, color=water_color, edgecolor='black', linewidth=0.5, alpha=0.85)
-                    
+                # Water/Pits (None HSG) legend entry if present
+                if has_water:
                     legend_handles.append(Patch(facecolor=water_color, edgecolor='black', label='Water/Pits'))
                 
-                # Plot AOI boundary
-                for feature in aoi_layer.getFeatures():
-                    geom = feature.geometry()
-                    boundary = geom.boundary()
-                    
-                    if boundary.isMultipart():
-                        lines = boundary.asMultiPolyline()
-                        for line in lines:
-                            xs = [p.x() for p in line]
-                            ys = [p.y() for p in line]
-                            ax.plot(xs, ys, color='darkblue', linewidth=3.5, zorder=10)
-                    else:
-                        line = boundary.asPolyline()
-                        xs = [p.x() for p in line]
-                        ys = [p.y() for p in line]
-                        ax.plot(xs, ys, color='darkblue', linewidth=3.5, zorder=10)
+                # Plot AOI boundary (dissolved WGS84 AOI from the clip step) as one artist
+                boundary_lines = []
+                for line in QgsGeometry(aoi_geom.constGet().boundary()).constParts():
+                    if not isinstance(line, QgsLineString):
+                        line = line.curveToLine()
+                    boundary_lines.append(np.column_stack((line.xVector(), line.yVector())))
+                ax.add_collection(LineCollection(boundary_lines, colors='darkblue', linewidths=3.5, zorder=10))
                 
                 legend_handles.append(Patch(facecolor='none', edgecolor='darkblue', linewidth=3, label='AOI Boundary'))
                 
@@ -571,6 +1030,7 @@ class SSURGODownloaderAlgorithm(QgsProcessingAlgorithm):
                 ax.legend(handles=legend_handles, loc='upper left', fontsize=11, framealpha=0.95, edgecolor='black')
                 ax.grid(True, alpha=0.3, linestyle='--', linewidth=0.5)
                 ax.set_aspect('equal')
+                ax.autoscale_view()  # collections do not update the data limits on their own
                 
                 # Info box
                 info_text = 'Hydrologic Soil Group (HSG):\n\n' + \
@@ -1,75 +1,105 @@
 import geopandas as gpd
-from shapely.geometry import LineString, Point
+from shapely import wkb
+from shapely.geometry import LineString
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import os
 
-# Read the input shapefile
-folder_path = r'C:\_Projects\25000326 - Take 5 Aubrey\Drainage Report\GIS\SHP\hechms'
-line_layer = os.path.join(folder_path, 'Tc.shp')
-gdf = gpd.read_file(line_layer)
-
 def cut(line, distance):
     """Cut a LineString at a specified distance from its start."""
-    if distance <= 0.0 or distance >= line.length:
+    coords = np.asarray(line.coords)
+    # Cumulative 2D distance along the line at each vertex
+    seglen = np.hypot(*np.diff(coords[:, :2], axis=0).T)
+    cum = np.concatenate(([0.0], np.cumsum(seglen)))
+    if distance <= 0.0 or distance >= cum[-1]:
         return [line]
-    coords = list(line.coords)
-    for i, p in enumerate(coords):
-        pd = line.project(Point(p))
-        if pd == distance:
-            return [
-                LineString(coords[:i+1]),
-                LineString(coords[i:])
-            ]
-        if pd > distance:
-            prev_p = coords[i-1]
-            curr_p = coords[i]
-            seg = LineString([prev_p, curr_p])
-            prev_dist = line.project(Point(prev_p))
-            dist_to_prev = distance - prev_dist
-            ratio = dist_to_prev / seg.length
-            x = prev_p[0] + (curr_p[0] - prev_p[0]) * ratio
-            y = prev_p[1] + (curr_p[1] - prev_p[1]) * ratio
-            pt = (x, y)
-            first = coords[:i] + [pt]
-            second = [pt] + coords[i:]
-            return [
-                LineString(first),
-                LineString(second)
-            ]
-    return [line]
-
-# Split each feature at 100 units from its start
-rows = []
-for idx, row in gdf.iterrows():
-    geom = row.geometry
+    i = int(np.searchsorted(cum, distance))
+    if cum[i] == distance:
+        return [
+            LineString(coords[:i+1]),
+            LineString(coords[i:])
+        ]
+    ratio = (distance - cum[i-1]) / seglen[i-1]
+    pt = coords[i-1] + (coords[i] - coords[i-1]) * ratio
+    return [
+        LineString(np.vstack([coords[:i], pt])),
+        LineString(np.vstack([pt, coords[i:]]))
+    ]
+
+
+@lru_cache(maxsize=4096)
+def _cut_cached(wkb_bytes, distance):
+    """Memoized cut() keyed by the line's WKB, for repeated lines/distances."""
+    return tuple(cut(wkb.loads(wkb_bytes), distance))
+
+
+def cut_all(geom, distance):
+    """Cut every part of a line geometry; other geometries are returned unchanged."""
     if geom.geom_type == 'MultiLineString':
-        for part in geom.geoms:
-            segments = cut(part, 100)
-            for seg in segments:
-                new_row = row.copy()
-                new_row.geometry = seg
-                rows.append(new_row)
-    elif geom.geom_type == 'LineString':
-        segments = cut(geom, 100)
-        for seg in segments:
-            new_row = row.copy()
-            new_row.geometry = seg
-            rows.append(new_row)
+        return [seg for part in geom.geoms for seg in _cut_cached(part.wkb, distance)]
+    if geom.geom_type == 'LineString':
+        return list(_cut_cached(geom.wkb, distance))
+    # Keep non-line geometries unchanged
+    return [geom]
+
+
+# Layers with at least this many features are cut in worker processes
+PARALLEL_MIN_FEATURES = 2000
+
+
+def _cut_worker(wkb_bytes, distance):
+    """Process-pool entry point: cut one WKB geometry, returning WKB segments."""
+    return [seg.wkb for seg in cut_all(wkb.loads(wkb_bytes), distance)]
+
+
+def main():
+    # Read the input shapefile
+    folder_path = r'C:\_Projects\25000326 - Take 5 Aubrey\Drainage Report\GIS\SHP\hechms'
+    line_layer = os.path.join(folder_path, 'Tc.shp')
+    gdf = gpd.read_file(line_layer)
+
+    # Split each feature at 100 units from its start, one output row per segment
+    distance = 100
+    geoms = gdf.geometry.to_numpy()
+    geom_types = gdf.geometry.geom_type.to_numpy()
+    lengths = gdf.geometry.length.to_numpy()
+    # LineStrings no longer than the split distance and non-line geometries
+    # pass through untouched; MultiLineStrings are always split into parts
+    to_cut = np.flatnonzero(((geom_types == 'LineString') & (lengths > distance)) |
+                            (geom_types == 'MultiLineString'))
+    segments = [[geom] for geom in geoms]
+    if len(to_cut) >= PARALLEL_MIN_FEATURES:
+        wkb_list = [geoms[i].wkb for i in to_cut]
+        with ProcessPoolExecutor() as executor:
+            results = executor.map(_cut_worker, wkb_list, [distance] * len(wkb_list), chunksize=256)
+            for i, result in zip(to_cut, results):
+                segments[i] = [wkb.loads(seg) for seg in result]
     else:
-        # Keep non-line geometries unchanged
-        rows.append(row.copy())
+        for i in to_cut:
+            segments[i] = cut_all(geoms[i], distance)
+    exploded = gdf.drop(columns=gdf.geometry.name).assign(geometry=segments).explode('geometry', ignore_index=True)
+
+    # Build a new GeoDataFrame
+    new_gdf = gpd.GeoDataFrame(exploded, geometry='geometry', crs=gdf.crs)
+
+    # Drop problematic 'fid' column if present
+    if 'fid' in new_gdf.columns:
+        new_gdf = new_gdf.drop(columns=['fid'])
 
-# Build a new GeoDataFrame
-new_gdf = gpd.GeoDataFrame(rows, columns=gdf.columns, crs=gdf.crs)
+    # Add or update length field (units same as CRS)
+    new_gdf['calc_length'] = new_gdf.geometry.length
 
-# Drop problematic 'fid' column if present
-if 'fid' in new_gdf.columns:
-    new_gdf = new_gdf.drop(columns=['fid'])
+    # Save to GeoPackage (pyogrio writes in batches; fall back to the default engine)
+    output_path = os.path.join(folder_path, 'Tc_Split.gpkg')
+    try:
+        import pyogrio
+        pyogrio.write_dataframe(new_gdf, output_path, layer='split_lines', driver='GPKG')
+    except ImportError:
+        new_gdf.to_file(output_path, layer='split_lines', driver='GPKG')
 
-# Add or update length field (units same as CRS)
-new_gdf['calc_length'] = new_gdf.geometry.length
+    print(f"GeoPackage created at: {output_path}")
 
-# Save to GeoPackage
-output_path = os.path.join(folder_path, 'Tc_Split.gpkg')
-new_gdf.to_file(output_path, layer='split_lines', driver='GPKG')
 
-print(f"GeoPackage created at: {output_path}")
\ No newline at end of file
+if __name__ == '__main__':
+    main()
@@ -24,6 +24,7 @@ from qgis.core import (
     QgsVectorLayer,
     QgsField,
     QgsFeature,
+    QgsFeatureRequest,
     QgsGeometry,
     QgsExpression,
     QgsExpressionContext,
@@ -35,6 +36,7 @@ from qgis.core import (
 )
 from qgis import processing
 import os
+import numpy as np
 import xlsxwriter
 
 class CalculateSubbasinCN(QgsProcessingAlgorithm):
@@ -223,70 +225,70 @@ class CalculateSubbasinCN(QgsProcessingAlgorithm):
             'OUTPUT': 'memory:'
         }, context=context, feedback=feedback)['OUTPUT']
         
-        # Step 3: Remove features with NULL/blank subbasin names
-        feedback.setProgressText("Removing features outside subbasins...")
-        unioned.startEditing()
-        features_to_delete = []
-        for feature in unioned.getFeatures():
-            subbasin_name = feature[subbasins_name_field]
-            if subbasin_name is None or str(subbasin_name).strip() == '':
-                features_to_delete.append(feature.id())
-        unioned.deleteFeatures(features_to_delete)
-        unioned.commitChanges()
-        
-        # Step 4: Calculate CN based on HSG
-        feedback.setProgressText("Calculating CN values...")
-        # Add CN field if it doesn't exist
-        if 'CN' not in [field.name() for field in unioned.fields()]:
-            unioned.dataProvider().addAttributes([QgsField('CN', QVariant.Double)])
+        # Steps 3-5 in a single pass: drop features with NULL/blank subbasin
+        # names, assign CN from HSG and calculate areas in acres
+        feedback.setProgressText("Calculating CN values and areas...")
+        # Add CN and area fields up-front if they don't exist
+        new_fields = [QgsField(name, QVariant.Double) for name in ('CN', 'area_ac')
+                      if name not in [field.name() for field in unioned.fields()]]
+        if new_fields:
+            unioned.dataProvider().addAttributes(new_fields)
             unioned.updateFields()
         
         cn_idx = unioned.fields().indexFromName('CN')
-        unioned.startEditing()
-        for feature in unioned.getFeatures():
-            hsg = feature[soils_hsg_field]
-            cn_value = None
-            if hsg == 'A':
-                cn_value = feature[cn_a_field]
-            elif hsg == 'B':
-                cn_value = feature[cn_b_field]
-            elif hsg == 'C':
-                cn_value = feature[cn_c_field]
-            elif hsg == 'D':
-                cn_value = feature[cn_d_field]
-            
-            if cn_value is not None:
-                unioned.changeAttributeValue(feature.id(), cn_idx, float(cn_value))
-        unioned.commitChanges()
-        
-        # Step 5: Calculate areas in acres
-        feedback.setProgressText("Calculating areas...")
-        unioned.startEditing()
-        # Add area field if it doesn't exist
-        if 'area_ac' not in [field.name() for field in unioned.fields()]:
-            unioned.dataProvider().addAttributes([QgsField('area_ac', QVariant.Double)])
-            unioned.updateFields()
-        
         area_idx = unioned.fields().indexFromName('area_ac')
-        for feature in unioned.getFeatures():
+        subbasin_name_idx = unioned.fields().indexFromName(subbasins_name_field)
+        hsg_idx = unioned.fields().indexFromName(soils_hsg_field)
+        # HSG -> index of the matching land use CN field
+        hsg_to_cn_idx = {
+            'A': unioned.fields().indexFromName(cn_a_field),
+            'B': unioned.fields().indexFromName(cn_b_field),
+            'C': unioned.fields().indexFromName(cn_c_field),
+            'D': unioned.fields().indexFromName(cn_d_field)
+        }
+        # Geometry is needed for the area, but only these attributes are read
+        request = QgsFeatureRequest().setSubsetOfAttributes(
+            [idx for idx in [subbasin_name_idx, hsg_idx] + list(hsg_to_cn_idx.values()) if idx >= 0])
+        features_to_delete = []
+        updates = {}
+        names = []
+        cns = []
+        areas = []
+        for feature in unioned.getFeatures(request):
+            subbasin_name = feature.attribute(subbasin_name_idx)
+            if subbasin_name is None or str(subbasin_name).strip() == '':
+                features_to_delete.append(feature.id())
+                continue
+            
+            hsg_cn_idx = hsg_to_cn_idx.get(feature.attribute(hsg_idx))
+            cn_value = feature.attribute(hsg_cn_idx) if hsg_cn_idx is not None else None
+            
             # Convert square meters to acres
             area_acres = feature.geometry().area() * 0.000247105
-            unioned.changeAttributeValue(feature.id(), area_idx, area_acres)
-        unioned.commitChanges()
+            updates[feature.id()] = {area_idx: area_acres}
+            
+            if cn_value is not None:
+                updates[feature.id()][cn_idx] = float(cn_value)
+                
+                # Collect for the weighted CN per subbasin (Step 6)
+                names.append(subbasin_name)
+                cns.append(float(cn_value))
+                areas.append(area_acres)
+        
+        # Apply all edits straight to the provider, bypassing the edit buffer
+        unioned.dataProvider().changeAttributeValues(updates)
+        unioned.dataProvider().deleteFeatures(features_to_delete)
         
         # Step 6: Calculate weighted CN per subbasin
         feedback.setProgressText("Calculating weighted CNs...")
-        subbasin_data = {}
-        for feature in unioned.getFeatures():
-            subbasin_name = feature[subbasins_name_field]
-            cn = feature['CN']
-            area = feature['area_ac']
-            
-            if cn is not None and area is not None:
-                if subbasin_name not in subbasin_data:
-                    subbasin_data[subbasin_name] = {'cn_area': 0, 'total_area': 0}
-                subbasin_data[subbasin_name]['cn_area'] += float(cn) * float(area)
-                subbasin_data[subbasin_name]['total_area'] += float(area)
+        
+        # Group by subbasin: sum(CN * area) / sum(area) via bincount over the name codes
+        unique_names, name_codes = np.unique(names, return_inverse=True)
+        areas = np.asarray(areas, dtype=float)
+        cn_area = np.bincount(name_codes, weights=np.asarray(cns, dtype=float) * areas, minlength=len(unique_names))
+        total_area = np.bincount(name_codes, weights=areas, minlength=len(unique_names))
+        weighted_cns = {name: float(cn_area[i] / total_area[i])
+                        for i, name in enumerate(unique_names.tolist()) if total_area[i] > 0}
         
         # Update subbasins layer with weighted CN
         if 'CN' not in [field.name() for field in subbasins_layer.fields()]:
@@ -294,15 +296,22 @@ class CalculateSubbasinCN(QgsProcessingAlgorithm):
             subbasins_layer.updateFields()
         
         cn_idx = subbasins_layer.fields().indexFromName('CN')
-        subbasins_layer.startEditing()
-        for feature in subbasins_layer.getFeatures():
-            subbasin_name = feature[subbasins_name_field]
-            if subbasin_name in subbasin_data:
-                data = subbasin_data[subbasin_name]
-                if data['total_area'] > 0:
-                    weighted_cn = data['cn_area'] / data['total_area']
-                    subbasins_layer.changeAttributeValue(feature.id(), cn_idx, weighted_cn)
-        subbasins_layer.commitChanges()
+        name_idx = subbasins_layer.fields().indexFromName(subbasins_name_field)
+        # Only the name is needed to match subbasins; skip geometry and other attributes
+        request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry).setSubsetOfAttributes([name_idx])
+        # Write through the edit buffer so the open layer, its attribute table and
+        # undo stack see the change; a layer already in edit mode is left for the
+        # user to save alongside their own pending edits
+        started_edit = not subbasins_layer.isEditable()
+        if started_edit:
+            subbasins_layer.startEditing()
+        for feature in subbasins_layer.getFeatures(request):
+            subbasin_name = feature.attribute(name_idx)
+            if subbasin_name in weighted_cns:
+                subbasins_layer.changeAttributeValue(feature.id(), cn_idx, weighted_cns[subbasin_name])
+        if started_edit:
+            subbasins_layer.commitChanges()
+        subbasins_layer.triggerRepaint()
         
         return {'UNIONED_LAYER': parameters['OUTPUT_UNION']}
 
@@ -7,7 +7,8 @@ QGIS Version: 3.44+
 This tool downloads USGS 3DEP OPR DEM tiles that intersect an AOI polygon
 and creates a seamless mosaic with highest-resolution priority.
 
-No external dependencies required - uses only built-in QGIS/GDAL libraries.
+No external dependencies required - uses only libraries bundled with QGIS
+(GDAL, requests).
 """
 
 from qgis.PyQt.QtCore import QCoreApplication, QVariant
@@ -21,7 +22,6 @@ from qgis.core import (
     QgsProcessingParameterNumber,
     QgsProcessingParameterEnum,
     QgsProcessingException,
-    QgsVectorLayer,
     QgsGeometry,
     QgsCoordinateReferenceSystem,
     QgsCoordinateTransform,
@@ -31,17 +31,55 @@ from qgis.core import (
     QgsMessageLog,
     Qgis
 )
-from qgis import processing
 
 import os
 import json
+import hashlib
 import csv
+import io
 import time
 import re
-import subprocess
-from urllib import request, error, parse
+import struct
+import uuid
+import numpy as np
+from contextlib import contextmanager
+from functools import lru_cache
+from email.utils import formatdate
+from xml.etree import ElementTree
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from osgeo import gdal, osr, ogr
 
+
+class _LogBuffer:
+    """Collects log lines and posts them to feedback in batches"""
+
+    def __init__(self, feedback, max_lines=32, max_wait=0.5):
+        self.feedback = feedback
+        self.max_lines = max_lines
+        self.max_wait = max_wait
+        self.lines = []
+        self.last_flush = time.monotonic()
+
+    def push(self, message):
+        self.lines.append(message)
+        if len(self.lines) >= self.max_lines or time.monotonic() - self.last_flush >= self.max_wait:
+            self.flush()
+
+    def error(self, message):
+        # Keep ordering: earlier lines go out before the error
+        self.flush()
+        self.feedback.reportError(message)
+
+    def flush(self):
+        if self.lines:
+            self.feedback.pushInfo('\n'.join(self.lines))
+            self.lines = []
+        self.last_flush = time.monotonic()
+
+
 class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
     """
     QGIS Processing Algorithm for downloading USGS 3DEP OPR DEMs
@@ -52,8 +90,10 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
     OUTPUT_FOLDER = 'OUTPUT_FOLDER'
     CLIP_TO_AOI = 'CLIP_TO_AOI'
     CONVERT_TO_FEET = 'CONVERT_TO_FEET'
+    STREAM_TILES = 'STREAM_TILES'
     GENERATE_CONTOURS = 'GENERATE_CONTOURS'
     CONTOUR_INTERVAL = 'CONTOUR_INTERVAL'
+    CONTOUR_RESOLUTION = 'CONTOUR_RESOLUTION'
     CONTOUR_FORMAT = 'CONTOUR_FORMAT'
 
     # Contour format options
@@ -63,6 +103,49 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
     INDEX_LAYER = "https://index.nationalmap.gov/arcgis/rest/services/3DEPElevationIndex/MapServer/11/query"
     OUT_FIELDS = ["workunit", "project", "ql", "dem_gsd_meters", "sourcedem_link", "metadata_link"]
     PAGE_SIZE = 2000
+    INDEX_WORKERS = 4
+
+    # Tile filenames encode the lower-left corner in km, e.g. ..._w0412n3712_...
+    COORD_RE = re.compile(r'w(\d{4})n(\d{4})')
+    TILE_SIZE = 1000
+
+    # Index responses are reused for a day; tile listings revalidate by ETag
+    INDEX_CACHE_TTL = 86400
+
+    # Concurrent tile downloads (S3 serves parallel GETs well)
+    DOWNLOAD_WORKERS = 8
+
+    # GDAL settings for reading tiles in place over HTTP range requests
+    VSICURL_CONFIG = {
+        'CPL_VSIL_CURL_ALLOWED_EXTENSIONS': '.tif',
+        'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+        'VSI_CACHE': 'TRUE',
+        'GDAL_HTTP_MULTIPLEX': 'YES',
+        'GDAL_HTTP_VERSION': '2',
+    }
+
+    METERS_TO_FEET = 3.28084
+
+    # GDAL settings while the mosaic is built: no sibling listing per tile open,
+    # cached tile reads and threaded warp/compression
+    MOSAIC_CONFIG = {
+        'GDAL_DISABLE_READDIR_ON_OPEN': 'EMPTY_DIR',
+        'VSI_CACHE': 'TRUE',
+        'VSI_CACHE_SIZE': str(64 * 1024 * 1024),
+        'GDAL_NUM_THREADS': 'ALL_CPUS',
+    }
+    # Block cache while the mosaic is written. GDAL reads GDAL_CACHEMAX only
+    # once per process, long before this runs inside QGIS, so it is set
+    # through gdal.SetCacheMax() instead (see gdal_cache_max)
+    MOSAIC_CACHE_MAX = 2048 * 1024 * 1024
+
+    # Transforms keyed by (source, destination) CRS, shared across runs
+    _transform_cache = {}
+
+    # Cloud-optimized GeoTIFF with internal overviews so QGIS and contouring read
+    # only what they need; Float32 DEMs: DEFLATE with the floating-point predictor
+    COG_OPTIONS = ['COMPRESS=DEFLATE', 'PREDICTOR=FLOATING_POINT', 'LEVEL=6', 'BLOCKSIZE=512',
+                   'OVERVIEWS=IGNORE_EXISTING', 'NUM_THREADS=ALL_CPUS', 'BIGTIFF=IF_SAFER']
 
     def tr(self, string):
         """Returns a translatable string"""
@@ -106,8 +189,10 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
         - <b>Output Folder</b>: Directory for all outputs (DEM.tif, contours, tiles folder)
         - <b>Clip to AOI</b>: Whether to clip mosaic to AOI bounds
         - <b>Convert to Feet</b>: Convert elevations from meters to feet
+        - <b>Stream Tiles</b>: Read only the needed parts of each tile over HTTP instead of downloading whole tiles (no tiles folder or manifest is written)
         - <b>Generate Contours</b>: Create contour lines from DEM
         - <b>Contour Interval</b>: Vertical spacing between contours (default 1 foot)
+        - <b>Contour Cell Size</b>: Resample the DEM to this cell size (AOI CRS units, averaged) before contouring; 0 uses full resolution. Coarser cells are much faster and smooth out sub-interval noise
         - <b>Contour Format</b>: Output format - DXF (3D for CAD), Shapefile, or GeoPackage
 
         <b>Outputs (all saved to Output Folder):</b>
@@ -158,6 +243,15 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
             )
         )
 
+        # Stream tiles via /vsicurl/ instead of downloading them
+        self.addParameter(
+            QgsProcessingParameterBoolean(
+                self.STREAM_TILES,
+                self.tr('Stream tiles via /vsicurl/ (skip tile downloads)'),
+                defaultValue=False
+            )
+        )
+
         # Contour generation option
         self.addParameter(
             QgsProcessingParameterBoolean(
@@ -178,6 +272,17 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
             )
         )
 
+        # Optional coarser DEM for contouring - 0 keeps full resolution
+        self.addParameter(
+            QgsProcessingParameterNumber(
+                self.CONTOUR_RESOLUTION,
+                self.tr('Contour DEM cell size (0 = full resolution)'),
+                type=QgsProcessingParameterNumber.Double,
+                defaultValue=0.0,
+                minValue=0.0
+            )
+        )
+
         # Contour format selection
         self.addParameter(
             QgsProcessingParameterEnum(
@@ -191,13 +296,25 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
     def processAlgorithm(self, parameters, context, feedback):
         """Main processing logic"""
 
+        # Failed GDAL/OGR calls raise inside this run only; UseExceptions()
+        # would switch error handling for every other tool and plugin too.
+        # One pooled session serves the index, listings and tile downloads.
+        with gdal.ExceptionMgr(), ogr.ExceptionMgr(), osr.ExceptionMgr(), \
+                self.create_session() as session:
+            return self.run_download(parameters, context, feedback, session)
+
+    def run_download(self, parameters, context, feedback, session):
+        """Downloads, mosaics and contours the DEMs (GDAL exceptions enabled)"""
+
         # Get parameters
         aoi_layer = self.parameterAsVectorLayer(parameters, self.INPUT_AOI, context)
         output_folder = self.parameterAsString(parameters, self.OUTPUT_FOLDER, context)
         clip_to_aoi = self.parameterAsBoolean(parameters, self.CLIP_TO_AOI, context)
         convert_to_feet = self.parameterAsBoolean(parameters, self.CONVERT_TO_FEET, context)
+        stream_tiles = self.parameterAsBoolean(parameters, self.STREAM_TILES, context)
         generate_contours = self.parameterAsBoolean(parameters, self.GENERATE_CONTOURS, context)
         contour_interval = self.parameterAsDouble(parameters, self.CONTOUR_INTERVAL, context)
+        contour_resolution = self.parameterAsDouble(parameters, self.CONTOUR_RESOLUTION, context)
         contour_format_idx = self.parameterAsEnum(parameters, self.CONTOUR_FORMAT, context)
         contour_format = self.CONTOUR_FORMATS[contour_format_idx]
 
@@ -227,20 +344,31 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
 
         # Create output directories
         os.makedirs(output_folder, exist_ok=True)
-        os.makedirs(tiles_folder, exist_ok=True)
+        if not stream_tiles:
+            os.makedirs(tiles_folder, exist_ok=True)
+        self.cache_dir = os.path.join(output_folder, '.cache')
 
         feedback.pushInfo(f'Output folder: {output_folder}')
         feedback.pushInfo(f'DEM output: {mosaic_path}')
         if generate_contours:
             feedback.pushInfo(f'Contour output: {contour_path}')
 
-        # Step 1: Convert AOI to WGS84 and get Esri JSON geometry
+        # Step 1: Union the AOI once, derive its WGS84 and UTM copies and get Esri JSON geometry
         feedback.pushInfo('\n=== Step 1: Processing AOI ===')
-        esri_geom = self.aoi_to_esri_polygon(aoi_layer, feedback)
+        aoi_geom = QgsGeometry.unaryUnion([feature.geometry() for feature in aoi_layer.getFeatures()])
+        aoi_wgs84 = self.transformed(aoi_geom, aoi_layer.crs(), QgsCoordinateReferenceSystem('EPSG:4326'), context)
+        esri_geom = self.aoi_to_esri_polygon(aoi_wgs84, feedback)
+
+        # Tile names carry UTM coordinates in the zone of the project
+        utm_crs = self.utm_crs_for(aoi_wgs84)
+        feedback.pushInfo(f'Tile grid CRS: {utm_crs.authid()}')
+        aoi_utm = self.transformed(aoi_geom, aoi_layer.crs(), utm_crs, context)
+        aoi_engine = QgsGeometry.createGeometryEngine(aoi_utm.constGet())
+        aoi_engine.prepareGeometry()
 
         # Step 2: Query USGS 3DEP Index for intersecting workunits
         feedback.pushInfo('\n=== Step 2: Querying USGS 3DEP Index ===')
-        workunits = self.query_3dep_index(esri_geom, feedback)
+        workunits = self.query_3dep_index(session, esri_geom, feedback)
 
         if not workunits:
             raise QgsProcessingException('No OPR DEM workunits found for this AOI')
@@ -251,17 +379,30 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
         feedback.pushInfo('\n=== Step 3: Filtering tiles by AOI ===')
         all_tiles = []
 
-        for wu in workunits:
-            feedback.pushInfo(f"\nProcessing workunit: {wu['workunit']}")
-            feedback.pushInfo(f"  Project: {wu['project']}")
-            feedback.pushInfo(f"  GSD: {wu['dem_gsd_meters']}m")
+        # Fetch all workunit listings concurrently (once per source link), then filter in order
+        with ThreadPoolExecutor(max_workers=self.INDEX_WORKERS) as executor:
+            by_link = {}
+            for wu in workunits:
+                if wu['sourcedem_link'] not in by_link:
+                    by_link[wu['sourcedem_link']] = executor.submit(self.get_tile_urls_from_workunit, session, wu)
+            listings = [by_link[wu['sourcedem_link']] for wu in workunits]
+
+        log = _LogBuffer(feedback)
+        for wu, listing in zip(workunits, listings):
+            log.push(f"\nProcessing workunit: {wu['workunit']}")
+            log.push(f"  Project: {wu['project']}")
+            log.push(f"  GSD: {wu['dem_gsd_meters']}m")
 
-            tile_urls = self.get_tile_urls_from_workunit(wu, feedback)
-            feedback.pushInfo(f"  Total tiles in workunit: {len(tile_urls)}")
+            try:
+                tile_urls = listing.result()
+            except Exception as e:
+                log.error(f"Could not fetch tile listing: {str(e)}")
+                tile_urls = []
+            log.push(f"  Total tiles in workunit: {len(tile_urls)}")
 
             # Filter tiles
-            filtered_urls = self.filter_tiles_by_aoi(tile_urls, aoi_layer, feedback)
-            feedback.pushInfo(f"  Tiles intersecting AOI: {len(filtered_urls)}")
+            filtered_urls = self.filter_tiles_by_aoi(tile_urls, aoi_utm, aoi_engine)
+            log.push(f"  Tiles intersecting AOI: {len(filtered_urls)}")
 
             for url in filtered_urls:
                 all_tiles.append({
@@ -272,23 +413,36 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
                     'url': url,
                     'metadata_link': wu['metadata_link']
                 })
+        log.flush()
 
         if not all_tiles:
             raise QgsProcessingException('No tiles intersect the AOI')
 
+        # Overlapping projects are all kept: the layered mosaic VRT puts finer
+        # tiles on top, and coarser ones fill wherever those are nodata
+
         feedback.pushInfo(f'\n=== Total tiles to download: {len(all_tiles)} ===')
 
-        # Step 4: Download tiles
-        feedback.pushInfo('\n=== Step 4: Downloading tiles ===')
-        results = self.download_tiles(all_tiles, tiles_folder, feedback)
+        if stream_tiles:
+            # Steps 4-5: GDAL reads the remote COGs directly, only the blocks it needs
+            feedback.pushInfo('\n=== Step 4: Streaming tiles via /vsicurl/ (no download) ===')
+            results = [{**tile, 'local_path': '/vsicurl/' + tile['url'], 'status': 'streamed'}
+                       for tile in all_tiles]
+            tiles_folder = None
+            manifest_path = None
+        else:
+            # Step 4: Download tiles
+            feedback.pushInfo('\n=== Step 4: Downloading tiles ===')
+            results = self.download_tiles(session, all_tiles, tiles_folder, feedback)
 
-        # Step 5: Write manifest
-        feedback.pushInfo('\n=== Step 5: Writing manifest ===')
-        self.write_manifest(results, manifest_path, feedback)
+            # Step 5: Write manifest
+            feedback.pushInfo('\n=== Step 5: Writing manifest ===')
+            self.write_manifest(results, manifest_path, feedback)
 
         # Step 6: Create mosaic
         feedback.pushInfo('\n=== Step 6: Creating mosaic ===')
-        self.create_mosaic(results, mosaic_path, aoi_layer if clip_to_aoi else None, convert_to_feet, aoi_layer.crs(), feedback)
+        with self.gdal_config(**(self.VSICURL_CONFIG if stream_tiles else {})):
+            self.create_mosaic(results, mosaic_path, aoi_geom if clip_to_aoi else None, convert_to_feet, aoi_layer.crs(), feedback)
 
         # Step 7: Generate contours (optional)
         final_contour_path = None
@@ -304,6 +458,7 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
                 mosaic_path,
                 contour_path,
                 contour_interval,
+                contour_resolution,
                 contour_format,
                 aoi_layer.crs(),  # Pass AOI's CRS for reprojection
                 feedback
@@ -312,7 +467,8 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
         feedback.pushInfo('\n' + '='*60)
         feedback.pushInfo('Processing complete!')
         feedback.pushInfo(f'  DEM: {mosaic_path}')
-        feedback.pushInfo(f'  Tiles: {tiles_folder}')
+        if tiles_folder:
+            feedback.pushInfo(f'  Tiles: {tiles_folder}')
         if final_contour_path:
             feedback.pushInfo(f'  Contours: {final_contour_path}')
         feedback.pushInfo('='*60)
@@ -338,54 +494,134 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
             'OUTPUT_CONTOURS': final_contour_path
         }
 
-    def aoi_to_esri_polygon(self, layer, feedback):
-        """Convert AOI layer to Esri JSON polygon in WGS84"""
-
-        # Get union of all features
-        features = list(layer.getFeatures())
-        if not features:
-            raise QgsProcessingException('No features in AOI layer')
-
-        # Union all geometries
-        geom = QgsGeometry()
-        for feature in features:
-            if geom.isEmpty():
-                geom = feature.geometry()
-            else:
-                geom = geom.combine(feature.geometry())
-
-        # Transform to WGS84
-        source_crs = layer.crs()
-        wgs84_crs = QgsCoordinateReferenceSystem('EPSG:4326')
+    def coordinate_transform(self, src_crs, dst_crs, context):
+        """
+        Returns a cached transform between two CRS so the PROJ pipeline is
+        only looked up once per QGIS session.
+        """
+        key = (src_crs.authid() or src_crs.toWkt(), dst_crs.authid() or dst_crs.toWkt())
+        transform = DownloadOprDemsAlgorithm._transform_cache.get(key)
+        if transform is None:
+            transform = QgsCoordinateTransform(src_crs, dst_crs, context.transformContext())
+            DownloadOprDemsAlgorithm._transform_cache[key] = transform
+        return transform
+
+    def transformed(self, geom, source_crs, dest_crs, context):
+        """Return a copy of geom in dest_crs (an untouched copy when the CRS already match)"""
+        geom = QgsGeometry(geom)
+        if source_crs != dest_crs:
+            geom.transform(self.coordinate_transform(source_crs, dest_crs, context))
+        return geom
+
+    def utm_crs_for(self, geom):
+        """NAD83(2011) UTM CRS for the zone containing the WGS84 geometry's center"""
+        lon = geom.boundingBox().center().x()
+        zone = min(max(int((lon + 180) // 6) + 1, 1), 60)
+
+        # NAD83(2011) / UTM zones 1N-19N are EPSG:6330-6348, 59N/60N are EPSG:6328/6329;
+        # elsewhere use WGS 84 / UTM
+        if zone <= 19:
+            epsg = 6329 + zone
+        elif zone >= 59:
+            epsg = 6269 + zone
+        else:
+            epsg = 32600 + zone
+        return QgsCoordinateReferenceSystem(f'EPSG:{epsg}')
 
-        if source_crs != wgs84_crs:
-            transform = QgsCoordinateTransform(source_crs, wgs84_crs, QgsProject.instance())
-            geom.transform(transform)
+    def aoi_to_esri_polygon(self, geom, feedback):
+        """Convert the WGS84 AOI geometry to an Esri JSON polygon"""
 
         # Get bounds
         bbox = geom.boundingBox()
         feedback.pushInfo(f'AOI bounds (WGS84): {bbox.xMinimum():.6f}, {bbox.yMinimum():.6f}, {bbox.xMaximum():.6f}, {bbox.yMaximum():.6f}')
 
-        # Convert to Esri JSON format
-        rings = []
-
-        if geom.isMultipart():
-            multipolygon = geom.asMultiPolygon()
-            for polygon in multipolygon:
-                for ring in polygon:
-                    rings.append([[pt.x(), pt.y()] for pt in ring])
-        else:
-            polygon = geom.asPolygon()
-            for ring in polygon:
-                rings.append([[pt.x(), pt.y()] for pt in ring])
+        # Convert to Esri JSON format. GeoJSON polygon coordinates are already
+        # [x, y] ring lists, so let QGIS serialize them in C++ instead of
+        # walking every vertex in Python
+        geom = QgsGeometry(geom)
+        geom.get().dropZValue()
+        geom.get().dropMValue()
+        geojson = json.loads(geom.asJson())
+        polygons = geojson['coordinates'] if geojson['type'] == 'MultiPolygon' else [geojson['coordinates']]
+        rings = [ring for polygon in polygons for ring in polygon]
 
         return {
             "rings": rings,
             "spatialReference": {"wkid": 4326}
         }
 
-    def query_3dep_index(self, esri_geom, feedback):
-        """Query USGS 3DEP Index for intersecting workunits"""
+    def cache_path(self, key, suffix):
+        """Path of a cached response for the given key"""
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest + suffix)
+
+    def cached_fetch(self, session, url, key, data=None, max_age=None, timeout=60):
+        """
+        Fetch url (POST when data is given) through the on-disk cache and
+        return the body as text. A cached GET is revalidated with
+        If-None-Match (stored ETag) and If-Modified-Since (time it was last
+        confirmed), and the cached copy is used if the server can't be
+        reached. With max_age (seconds) a fresh copy is used unasked.
+        """
+        body_path = self.cache_path(key, '.bin')
+        etag_path = self.cache_path(key, '.etag')
+        cached = os.path.exists(body_path)
+
+        if cached and max_age is not None and time.time() - os.path.getmtime(body_path) < max_age:
+            with open(body_path, 'rb') as f:
+                return f.read().decode('utf-8')
+
+        headers = {}
+        if cached and os.path.exists(etag_path):
+            with open(etag_path, encoding='utf-8') as f:
+                headers['If-None-Match'] = f.read().strip()
+        if cached and data is None:
+            headers['If-Modified-Since'] = formatdate(os.path.getmtime(body_path), usegmt=True)
+
+        try:
+            if data is None:
+                response = session.get(url, headers=headers, timeout=timeout)
+            else:
+                response = session.post(url, data=data, headers=headers, timeout=timeout)
+        except requests.RequestException:
+            if not (cached and data is None):
+                raise
+            with open(body_path, 'rb') as f:
+                return f.read().decode('utf-8')
+
+        if response.status_code == 304 and cached:
+            os.utime(body_path)
+            with open(body_path, 'rb') as f:
+                return f.read().decode('utf-8')
+
+        response.raise_for_status()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(body_path, 'wb') as f:
+            f.write(response.content)
+        etag = response.headers.get('ETag')
+        if etag:
+            with open(etag_path, 'w', encoding='utf-8') as f:
+                f.write(etag)
+        elif os.path.exists(etag_path):
+            os.remove(etag_path)
+
+        return response.content.decode('utf-8')
+
+    def fetch_index_page(self, session, params, cache_key):
+        """POST one index query (parameters as form data); raises on API errors"""
+        result = json.loads(self.cached_fetch(session, self.INDEX_LAYER, cache_key,
+                                              data=params, max_age=self.INDEX_CACHE_TTL))
+        if "error" in result:
+            os.remove(self.cache_path(cache_key, '.bin'))
+            raise QgsProcessingException(f"API Error: {result['error']}")
+        return result
+
+    def query_3dep_index(self, session, esri_geom, feedback):
+        """
+        Query USGS 3DEP Index for intersecting workunits. Pages after the
+        first are requested concurrently once the total count is known.
+        """
 
         base_params = {
             "f": "json",
@@ -399,51 +635,54 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
             "resultRecordCount": str(self.PAGE_SIZE),
         }
 
-        items = []
-        result_offset = 0
-
-        while True:
-            params = base_params.copy()
-            params["resultOffset"] = str(result_offset)
-            params["geometry"] = json.dumps(esri_geom)
+        base_params["geometry"] = json.dumps(esri_geom)
+        geom_key = json.dumps(esri_geom, sort_keys=True)
 
-            # Encode parameters as form data for POST body
-            data = parse.urlencode(params).encode('utf-8')
-
-            try:
-                # Make POST request with data in body
-                req = request.Request(self.INDEX_LAYER, data=data, method='POST')
-                req.add_header('Content-Type', 'application/x-www-form-urlencoded')
+        def fetch_page(result_offset):
+            params = dict(base_params, resultOffset=str(result_offset))
+            return self.fetch_index_page(session, params, geom_key + str(result_offset))
 
-                with request.urlopen(req, timeout=60) as response:
-                    result = json.loads(response.read().decode())
+        items = []
+        executor = ThreadPoolExecutor(max_workers=self.INDEX_WORKERS)
+        try:
+            first = executor.submit(fetch_page, 0)
+            pages = [first]
+            first_result = None if first.exception() else first.result()
+            if first_result and (len(first_result.get("features", [])) >= self.PAGE_SIZE
+                                 or first_result.get("exceededTransferLimit")):
+                # Ask for the total once, then fetch the remaining pages concurrently
+                count_params = {k: v for k, v in base_params.items()
+                                if k not in ("outFields", "orderByFields", "resultRecordCount")}
+                count_params["returnCountOnly"] = "true"
+                try:
+                    total = self.fetch_index_page(session, count_params, geom_key + "count")["count"]
+                    pages.extend(executor.submit(fetch_page, offset)
+                                 for offset in range(self.PAGE_SIZE, total, self.PAGE_SIZE))
+                except Exception as e:
+                    feedback.reportError(f"Error counting index results: {str(e)}")
 
-                if "error" in result:
-                    feedback.reportError(f"API Error: {result['error']}")
+            # Merge pages in offset order; stop at the first failed page
+            for i, page in enumerate(pages):
+                try:
+                    result = page.result()
+                except Exception as e:
+                    feedback.reportError(f"Error querying API: {str(e)}")
                     break
 
                 feats = result.get("features", [])
-                feedback.pushInfo(f"  Retrieved {len(feats)} features (offset {result_offset})")
+                feedback.pushInfo(f"  Retrieved {len(feats)} features (offset {i * self.PAGE_SIZE})")
 
                 for ftr in feats:
                     attrs = ftr.get("attributes", {})
                     if attrs.get("sourcedem_link"):
                         items.append(attrs)
-
-                if len(feats) < self.PAGE_SIZE:
-                    break
-
-                result_offset += self.PAGE_SIZE
-                time.sleep(0.2)
-
-            except Exception as e:
-                feedback.reportError(f"Error querying API: {str(e)}")
-                break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
         return items
 
-    def get_tile_urls_from_workunit(self, workunit_item, feedback):
-        """Get list of tile URLs from workunit"""
+    def get_tile_urls_from_workunit(self, session, workunit_item):
+        """Get list of tile URLs from workunit (runs in a worker thread, raises on failure)"""
 
         url = workunit_item['sourcedem_link']
 
@@ -453,121 +692,230 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
         prefix = url.split('prefix=')[1]
         listing_url = f"http://prd-tnm.s3.amazonaws.com/{prefix}/0_file_download_links.txt"
 
-        try:
-            with request.urlopen(listing_url, timeout=30) as response:
-                content = response.read().decode('utf-8')
-
-            lines = content.strip().split('\n')
-            tif_urls = [line.strip() for line in lines if line.strip().endswith('.tif')]
-            return tif_urls
+        content = self.cached_fetch(session, listing_url, listing_url, timeout=30)
 
-        except Exception as e:
-            feedback.reportError(f"Could not fetch tile listing: {str(e)}")
-            return []
+        # One strip per line, no intermediate split list
+        tif_urls = [line for line in map(str.strip, content.splitlines()) if line.endswith('.tif')]
+        return tif_urls
 
-    def parse_tile_coords(self, filename):
-        """Extract UTM coordinates from tile filename"""
-        match = re.search(r'w(\d{4})n(\d{4})', filename.lower())
+    @staticmethod
+    @lru_cache(maxsize=65536)
+    def parse_tile_coords(filename):
+        """Extract UTM coordinates from tile filename (memoized, names are parsed more than once)"""
+        match = DownloadOprDemsAlgorithm.COORD_RE.search(filename.lower())
         if match:
             easting = int(match.group(1)) * 1000
             northing = int(match.group(2)) * 1000
             return (easting, northing)
         return None
 
-    def filter_tiles_by_aoi(self, tile_urls, aoi_layer, feedback):
-        """Filter tiles to those intersecting AOI"""
+    def filter_tiles_by_aoi(self, tile_urls, aoi_utm, engine):
+        """
+        Filter tiles to those intersecting AOI. The AOI bounding box rejects
+        distant tiles cheaply; the rest are tested exactly against the
+        prepared UTM AOI geometry so irregular AOIs don't pull in tiles from
+        their gaps.
+        """
 
-        # Get AOI in UTM Zone 12N
-        utm_crs = QgsCoordinateReferenceSystem('EPSG:6341')
-        transform = QgsCoordinateTransform(aoi_layer.crs(), utm_crs, QgsProject.instance())
+        aoi_bbox = aoi_utm.boundingBox()
 
-        # Get AOI geometry in UTM
-        features = list(aoi_layer.getFeatures())
-        aoi_geom = QgsGeometry()
-        for feature in features:
-            if aoi_geom.isEmpty():
-                aoi_geom = feature.geometry()
-            else:
-                aoi_geom = aoi_geom.combine(feature.geometry())
+        # Parse tile corners once, skipping names without coordinates
+        parsed = [(url, self.parse_tile_coords(url.rsplit('/', 1)[-1])) for url in tile_urls]
+        parsed = [(url, coords) for url, coords in parsed if coords]
+        if not parsed:
+            return []
+        coords = np.array([c for _, c in parsed], dtype=np.int64)
+        easting, northing = coords[:, 0], coords[:, 1]
 
-        aoi_geom.transform(transform)
-        aoi_bbox = aoi_geom.boundingBox()
+        # Vectorized bbox test (tiles are ~1km x 1km)
+        mask = ((easting + self.TILE_SIZE >= aoi_bbox.xMinimum()) & (easting <= aoi_bbox.xMaximum()) &
+                (northing + self.TILE_SIZE >= aoi_bbox.yMinimum()) & (northing <= aoi_bbox.yMaximum()))
 
-        # Filter tiles
+        # Exact test for the bbox candidates only
         intersecting = []
-        for url in tile_urls:
-            filename = url.split('/')[-1]
-            coords = self.parse_tile_coords(filename)
+        for i in np.flatnonzero(mask):
+            e, n = int(easting[i]), int(northing[i])
+            tile_bbox = QgsRectangle(e, n, e + self.TILE_SIZE, n + self.TILE_SIZE)
+            # Keep the geometry referenced; constGet() does not own the C++ object
+            tile_geom = QgsGeometry.fromRect(tile_bbox)
+            if engine.intersects(tile_geom.constGet()):
+                intersecting.append(parsed[i][0])
 
-            if coords:
-                easting, northing = coords
-                # Create tile bbox (tiles are ~1km x 1km)
-                tile_bbox = QgsRectangle(easting, northing, easting + 1000, northing + 1000)
+        return intersecting
 
-                # Check intersection
-                if tile_bbox.intersects(aoi_bbox):
-                    intersecting.append(url)
+    def create_session(self):
+        """Create a pooled HTTP session with retry/backoff for tile downloads"""
+        session = requests.Session()
+        retry = Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504]
+        )
+        adapter = HTTPAdapter(pool_connections=self.DOWNLOAD_WORKERS,
+                              pool_maxsize=self.DOWNLOAD_WORKERS, max_retries=retry)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def read_manifest(self, manifest_path):
+        """Read a previous manifest into {url: row} (empty if missing or unreadable)"""
+        try:
+            with open(manifest_path, newline='', encoding='utf-8') as f:
+                return {row['url']: row for row in csv.DictReader(f)}
+        except (OSError, csv.Error, KeyError):
+            return {}
 
-        return intersecting
+    def download_tile(self, session, tile, output_folder, previous=None):
+        """
+        Download a single tile (runs in a worker thread). Returns (result, message)
+
+        A tile on disk counts as complete only if its size matches the size
+        recorded in the previous manifest. Complete tiles with a recorded
+        ETag/Last-Modified are revalidated with a conditional GET and a 304
+        reply skips the download. New data is written to a .part file and
+        only renamed into place once its length matches Content-Length. A
+        .part left by an interrupted run is resumed with a Range request,
+        guarded by If-Range so a changed file is fetched in full.
+        """
 
-    def download_tiles(self, tiles, output_folder, feedback):
-        """Download all tiles"""
+        url = tile['url']
+        filename = url.split('/')[-1]
+        output_path = os.path.join(output_folder, filename)
+        part_path = output_path + '.part'
+        previous = previous or {}
+        validators = {'etag': previous.get('etag', ''),
+                      'last_modified': previous.get('last_modified', ''),
+                      'size': previous.get('size', '')}
+        complete = (os.path.exists(output_path) and validators['size'] != ''
+                    and os.path.getsize(output_path) == int(validators['size']))
+
+        headers = {}
+        if complete and validators['etag']:
+            headers['If-None-Match'] = validators['etag']
+        if complete and validators['last_modified']:
+            headers['If-Modified-Since'] = validators['last_modified']
+
+        # Without validators the recorded size is all we can check
+        if complete and not headers:
+            return {**tile, **validators, 'local_path': output_path, 'status': 'exists'}, f'{filename}: already exists'
+
+        # The ETag of a partial download is kept beside it so the rest can be requested
+        etag_path = part_path + '.etag'
+        resume_from = 0
+        if not complete and os.path.exists(part_path) and os.path.exists(etag_path):
+            with open(etag_path, encoding='utf-8') as f:
+                headers['If-Range'] = f.read().strip()
+            resume_from = os.path.getsize(part_path)
+            headers['Range'] = f'bytes={resume_from}-'
 
-        results = []
-        total = len(tiles)
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=(10, 120)) as response:
+                if response.status_code == 304:
+                    return {**tile, **validators, 'local_path': output_path, 'status': 'unchanged'}, f'{filename}: unchanged'
+                if response.status_code == 416:
+                    # Partial file no longer matches the remote one; start over next run
+                    os.remove(etag_path)
+                response.raise_for_status()
+
+                # 206 continues the partial file; 200 means it changed (or no range support)
+                if response.status_code != 206:
+                    resume_from = 0
+                    etag = response.headers.get('ETag')
+                    if etag:
+                        with open(etag_path, 'w', encoding='utf-8') as f:
+                            f.write(etag)
+                    elif os.path.exists(etag_path):
+                        os.remove(etag_path)
+
+                written = resume_from
+                with open(part_path, 'ab' if resume_from else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        f.write(chunk)
+                        written += len(chunk)
+
+                # Content-Length is the encoded size, so only compare unencoded bodies
+                expected = response.headers.get('Content-Length')
+                if expected and 'Content-Encoding' not in response.headers and written != resume_from + int(expected):
+                    raise IOError(f'truncated download ({written} of {resume_from + int(expected)} bytes)')
+
+                validators = {'etag': response.headers.get('ETag', ''),
+                              'last_modified': response.headers.get('Last-Modified', ''),
+                              'size': str(written)}
+
+            os.replace(part_path, output_path)
+            if os.path.exists(etag_path):
+                os.remove(etag_path)
+            resumed = f', resumed at {resume_from/1024/1024:.1f} MB' if resume_from else ''
+            message = f'{filename}: downloaded ({written/1024/1024:.1f} MB{resumed})'
+            return {**tile, **validators, 'local_path': output_path, 'status': 'downloaded'}, message
+        except Exception as e:
+            # Keep a partial file only if it can be resumed next run
+            if os.path.exists(part_path) and not os.path.exists(etag_path):
+                os.remove(part_path)
+            return ({**tile, 'etag': '', 'last_modified': '', 'size': '', 'local_path': None, 'status': 'error'},
+                    f'{filename}: error: {str(e)}')
+
+    def download_tiles(self, session, tiles, output_folder, feedback):
+        """Download all tiles in parallel over the run's shared session"""
 
-        for i, tile in enumerate(tiles):
-            if feedback.isCanceled():
-                break
+        # Validators from the previous run allow conditional GETs
+        previous = self.read_manifest(os.path.join(output_folder, 'manifest.csv'))
 
-            # Update progress
-            progress = int((i / total) * 100)
-            feedback.setProgress(progress)
+        results = [None] * len(tiles)
+        total = len(tiles)
+        completed = 0
 
-            url = tile['url']
-            filename = url.split('/')[-1]
-            output_path = os.path.join(output_folder, filename)
+        log = _LogBuffer(feedback)
 
-            feedback.pushInfo(f'[{i+1}/{total}] {filename}')
+        executor = ThreadPoolExecutor(max_workers=self.DOWNLOAD_WORKERS)
+        try:
+            futures = {executor.submit(self.download_tile, session, tile, output_folder,
+                                       previous.get(tile['url'])): i
+                       for i, tile in enumerate(tiles)}
 
-            # Check if already exists
-            if os.path.exists(output_path) and os.path.getsize(output_path) > 1000000:
-                feedback.pushInfo(f'  Already exists')
-                status = 'exists'
-            else:
-                # Download
-                try:
-                    request.urlretrieve(url, output_path)
-                    status = 'downloaded'
-                    feedback.pushInfo(f'  Downloaded ({os.path.getsize(output_path)/1024/1024:.1f} MB)')
-                except Exception as e:
-                    feedback.reportError(f'  Error: {str(e)}')
-                    status = 'error'
-                    output_path = None
+            for future in as_completed(futures):
+                result, message = future.result()
+                results[futures[future]] = result
+                completed += 1
 
-            results.append({
-                **tile,
-                'local_path': output_path,
-                'status': status
-            })
+                if result['status'] == 'error':
+                    log.error(f'[{completed}/{total}] {message}')
+                else:
+                    log.push(f'[{completed}/{total}] {message}')
+                feedback.setProgress(100.0 * completed / total)
 
-            time.sleep(0.1)
+                if feedback.isCanceled():
+                    break
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            log.flush()
 
-        return results
+        # Tiles skipped by cancellation are left out
+        return [result for result in results if result is not None]
 
     def write_manifest(self, results, manifest_path, feedback):
-        """Write manifest CSV"""
+        """
+        Write manifest CSV. Rows are rendered in memory and written in one
+        go to a temp file that replaces the old manifest, so the next run's
+        conditional GETs never read a half-written file.
+        """
+
+        fieldnames = ['workunit', 'project', 'ql', 'dem_gsd_meters',
+                      'url', 'local_path', 'metadata_link', 'status',
+                      'etag', 'last_modified', 'size']
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fieldnames)
+        writer.writerows([result.get(name, '') for name in fieldnames] for result in results)
 
-        with open(manifest_path, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['workunit', 'project', 'ql', 'dem_gsd_meters',
-                         'url', 'local_path', 'metadata_link', 'status']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(results)
+        temp_path = manifest_path + '.tmp'
+        with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+            f.write(buffer.getvalue())
+        os.replace(temp_path, manifest_path)
 
         feedback.pushInfo(f'Manifest written: {manifest_path}')
 
-    def create_mosaic(self, results, mosaic_path, aoi_layer, convert_to_feet, target_crs, feedback):
+    def create_mosaic(self, results, mosaic_path, clip_geom, convert_to_feet, target_crs, feedback):
         """Create mosaic from tiles with highest-resolution priority, reprojected to target CRS"""
 
         # Group tiles by GSD
@@ -589,94 +937,103 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
         for gsd in sorted_gsds:
             feedback.pushInfo(f'  {gsd}m GSD: {len(tiles_by_gsd[gsd])} tiles')
 
-        # Use GDAL to create mosaic
-        # Process highest resolution first
-        feedback.pushInfo(f'\nProcessing {sorted_gsds[0]}m resolution tiles...')
-        tile_paths = tiles_by_gsd[sorted_gsds[0]]
+        # Layer all resolutions in one VRT. BuildVRT takes overlapping pixels
+        # from the last source listed, so coarsest tiles go first and the
+        # finest last; nodata in a finer tile lets the coarser data show through
+        feedback.pushInfo(f'\nLayering tiles with {sorted_gsds[0]}m resolution on top...')
+        tile_paths = [path for gsd in reversed(sorted_gsds) for path in tiles_by_gsd[gsd]]
 
-        # Build VRT first (virtual mosaic)
-        vrt_path = mosaic_path.replace('.tif', '_temp.vrt')
-
-        feedback.pushInfo('Building VRT...')
+        # Build VRT first (virtual mosaic, kept in memory). A single tile
+        # needs no mosaic unless the unit scaling has to live in a VRT
         vrt_options = gdal.BuildVRTOptions(
             resolution='highest',
             resampleAlg='bilinear'
         )
-        vrt_ds = gdal.BuildVRT(vrt_path, tile_paths, options=vrt_options)
-        vrt_ds = None
+        with self.gdal_config(**self.MOSAIC_CONFIG):
+            if len(tile_paths) == 1 and not convert_to_feet:
+                feedback.pushInfo('Single tile, reading it directly...')
+                vrt_ds = gdal.Open(tile_paths[0])
+            else:
+                feedback.pushInfo('Building VRT...')
+                vrt_ds = gdal.BuildVRT('', tile_paths, options=vrt_options)
+
+        # Unit conversion happens on read, fused into the warp below
+        if convert_to_feet:
+            feedback.pushInfo('Converting elevations from meters to feet...')
+            vrt_ds = self.scale_vrt(vrt_ds, self.METERS_TO_FEET)
 
         # Get target CRS as WKT for GDAL
         target_crs_wkt = target_crs.toWkt()
 
         # Clip to AOI if requested
-        if aoi_layer:
+        if clip_geom:
             feedback.pushInfo('Clipping to AOI bounds...')
 
-            # Get AOI bounds in target CRS (which is the AOI's native CRS)
-            features = list(aoi_layer.getFeatures())
-            aoi_geom = QgsGeometry()
-            for feature in features:
-                if aoi_geom.isEmpty():
-                    aoi_geom = feature.geometry()
-                else:
-                    aoi_geom = aoi_geom.combine(feature.geometry())
-
-            bbox = aoi_geom.boundingBox()
+            # AOI bounds in target CRS (which is the AOI's native CRS)
+            bbox = clip_geom.boundingBox()
 
             feedback.pushInfo(f'Reprojecting to {target_crs.authid()}...')
 
             # Warp with clipping and reprojection to target CRS
             warp_options = gdal.WarpOptions(
-                format='GTiff',
+                format='COG',
                 outputBounds=[bbox.xMinimum(), bbox.yMinimum(), bbox.xMaximum(), bbox.yMaximum()],
                 dstSRS=target_crs_wkt,
-                creationOptions=['COMPRESS=LZW', 'TILED=YES', 'BIGTIFF=IF_SAFER'],
-                resampleAlg='bilinear'
+                creationOptions=self.COG_OPTIONS,
+                resampleAlg='bilinear',
+                multithread=True,
+                warpMemoryLimit=2048
             )
         else:
             feedback.pushInfo(f'Reprojecting to {target_crs.authid()}...')
             # No clipping, but still reproject
             warp_options = gdal.WarpOptions(
-                format='GTiff',
+                format='COG',
                 dstSRS=target_crs_wkt,
-                creationOptions=['COMPRESS=LZW', 'TILED=YES', 'BIGTIFF=IF_SAFER'],
-                resampleAlg='bilinear'
+                creationOptions=self.COG_OPTIONS,
+                resampleAlg='bilinear',
+                multithread=True,
+                warpMemoryLimit=2048
             )
 
+        # Tiles already in the target CRS: nothing to resample, so copy the
+        # VRT (with any unit scaling) straight into the output, cropping to the
+        # AOI window on the source pixel grid if clipping
+        vrt_srs = osr.SpatialReference(wkt=vrt_ds.GetProjection())
+        same_crs = vrt_srs.IsSame(osr.SpatialReference(wkt=target_crs_wkt))
+
         feedback.pushInfo('Creating final mosaic...')
-        gdal.Warp(mosaic_path, vrt_path, options=warp_options)
+        with self.gdal_config(**self.MOSAIC_CONFIG), self.gdal_cache_max(self.MOSAIC_CACHE_MAX):
+            if same_crs:
+                feedback.pushInfo('Tiles already in target CRS, skipping warp')
+                proj_win = [bbox.xMinimum(), bbox.yMaximum(), bbox.xMaximum(), bbox.yMinimum()] if clip_geom else None
+                ds = gdal.Translate(mosaic_path, vrt_ds,
+                                    options=gdal.TranslateOptions(format='COG', creationOptions=self.COG_OPTIONS,
+                                                                  projWin=proj_win))
+            else:
+                ds = gdal.Warp(mosaic_path, vrt_ds, options=warp_options)
+        vrt_ds = None
 
-        # Clean up VRT
-        if os.path.exists(vrt_path):
-            os.remove(vrt_path)
+        # Get mosaic info from the dataset GDAL just wrote
+        feedback.pushInfo(f'\nMosaic created successfully!')
+        feedback.pushInfo(f'  Dimensions: {ds.RasterXSize} x {ds.RasterYSize} pixels')
+        feedback.pushInfo(f'  Resolution: {sorted_gsds[0]}m')
+        feedback.pushInfo(f'  CRS: {target_crs.authid()}')
 
-        # Convert to feet if requested
-        if convert_to_feet:
-            feedback.pushInfo('\nConverting elevations from meters to feet...')
-            self.convert_dem_to_feet(mosaic_path, feedback)
-
-        # Get mosaic info
-        ds = gdal.Open(mosaic_path)
-        if ds:
-            feedback.pushInfo(f'\nMosaic created successfully!')
-            feedback.pushInfo(f'  Dimensions: {ds.RasterXSize} x {ds.RasterYSize} pixels')
-            feedback.pushInfo(f'  Resolution: {sorted_gsds[0]}m')
-            feedback.pushInfo(f'  CRS: {target_crs.authid()}')
-
-            # Get elevation stats
-            band = ds.GetRasterBand(1)
-            stats = band.GetStatistics(True, True)
-            if stats:
-                units = 'ft' if convert_to_feet else 'm'
-                feedback.pushInfo(f'  Elevation range: {stats[0]:.2f} - {stats[1]:.2f} {units}')
-                feedback.pushInfo(f'  Mean elevation: {stats[2]:.2f} {units}')
-
-            file_size = os.path.getsize(mosaic_path) / (1024*1024)
-            feedback.pushInfo(f'  File size: {file_size:.1f} MB')
-
-            ds = None
-
-    def generate_contours(self, dem_path, output_path, interval, output_format, target_crs, feedback):
+        # Approximate elevation stats (decimated read, no full pass)
+        band = ds.GetRasterBand(1)
+        stats = band.GetStatistics(True, True)
+        if stats:
+            units = 'ft' if convert_to_feet else 'm'
+            feedback.pushInfo(f'  Elevation range: {stats[0]:.2f} - {stats[1]:.2f} {units}')
+            feedback.pushInfo(f'  Mean elevation: {stats[2]:.2f} {units}')
+        band = None
+        ds = None
+
+        file_size = os.path.getsize(mosaic_path) / (1024*1024)
+        feedback.pushInfo(f'  File size: {file_size:.1f} MB')
+
+    def generate_contours(self, dem_path, output_path, interval, resolution, output_format, target_crs, feedback):
         """
         Generate contours from DEM mosaic
 
@@ -684,6 +1041,7 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
             dem_path: Path to input DEM raster
             output_path: Path for output contours
             interval: Contour interval in DEM units
+            resolution: Cell size to average the DEM to before contouring (0 = full resolution)
             output_format: 'DXF', 'Shapefile', or 'GeoPackage'
             target_crs: Target CRS to reproject contours to (from AOI)
             feedback: Processing feedback object
@@ -694,105 +1052,103 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
 
         feedback.pushInfo(f'Generating contours with {interval} interval...')
 
+        mem_path = f'/vsimem/{uuid.uuid4().hex}_contours.gpkg'
+        contour_dem = dem_path
+        reproj_path = ''
+
         try:
             is_dxf = output_format == 'DXF'
 
-            # Always generate to temp shapefile first, then reproject and convert
-            temp_shp = output_path.replace('.dxf', '_temp.shp').replace('.gpkg', '_temp.shp').replace('.shp', '_temp.shp')
-
-            # Run GDAL contour algorithm
+            # Contour runtime scales with pixel count, so optionally average the DEM down first
+            if resolution > 0:
+                contour_dem = f'/vsimem/{uuid.uuid4().hex}_dem.tif'
+                feedback.pushInfo(f'  Resampling DEM to {resolution} cell size for contouring...')
+                with self.gdal_config(GDAL_NUM_THREADS='ALL_CPUS'):
+                    gdal.Warp(contour_dem, dem_path, options=gdal.WarpOptions(
+                        format='GTiff', xRes=resolution, yRes=resolution,
+                        resampleAlg='average', multithread=True
+                    ))
+
+            # Contour in-process into an in-memory GeoPackage so the
+            # intermediate stages never touch disk
             feedback.pushInfo('  Running GDAL contour...')
-            result = processing.run("gdal:contour", {
-                'INPUT': dem_path,
-                'BAND': 1,
-                'INTERVAL': interval,
-                'OFFSET': 0.0,
-                'FIELD_NAME': 'ELEV',
-                'CREATE_3D': True,  # Always create 3D for proper Z values
-                'IGNORE_NODATA': True,
-                'NODATA': None,
-                'OUTPUT': temp_shp
-            }, feedback=feedback, is_child_algorithm=True)
-
-            # Check if contours were generated
-            if not os.path.exists(temp_shp):
-                feedback.reportError('Contour generation failed - no output file created')
-                return None
+            dem_ds = gdal.Open(contour_dem)
+            band = dem_ds.GetRasterBand(1)
+            contour_ds = gdal.GetDriverByName('GPKG').Create(mem_path, 0, 0, 0, gdal.GDT_Unknown)
+            contour_lyr = contour_ds.CreateLayer(
+                'contours', srs=dem_ds.GetSpatialRef(), geom_type=ogr.wkbLineString25D
+            )
+            contour_lyr.CreateField(ogr.FieldDefn('ID', ogr.OFTInteger))
+            contour_lyr.CreateField(ogr.FieldDefn('ELEV', ogr.OFTReal))
+
+            options = [f'LEVEL_INTERVAL={interval}', 'LEVEL_BASE=0', 'ID_FIELD=0', 'ELEV_FIELD=1']
+            nodata = band.GetNoDataValue()
+            if nodata is not None:
+                options.append(f'NODATA={nodata}')
+
+            contour_lyr.StartTransaction()
+            gdal.ContourGenerateEx(
+                band, contour_lyr, options=options,
+                callback=lambda complete, message, data: 0 if feedback.isCanceled() else 1
+            )
+            contour_lyr.CommitTransaction()
+            band = None
+            dem_ds = None
 
             # Get statistics from the generated contours
-            contour_layer = QgsVectorLayer(temp_shp, 'contours', 'ogr')
-            if contour_layer.isValid():
-                count = contour_layer.featureCount()
-                feedback.pushInfo(f'  Generated {count} contour lines')
-
-                if count == 0:
-                    feedback.reportError('No contours generated - check if DEM has elevation variation')
-                    # Clean up temp files
-                    del contour_layer
-                    self.cleanup_shapefile(temp_shp)
-                    return None
+            count = contour_lyr.GetFeatureCount()
+            feedback.pushInfo(f'  Generated {count} contour lines')
 
-                # Get elevation range
-                elevations = []
-                for feat in contour_layer.getFeatures():
-                    elev = feat['ELEV']
-                    if elev is not None:
-                        elevations.append(elev)
+            if count == 0:
+                feedback.reportError('No contours generated - check if DEM has elevation variation')
+                contour_lyr = None
+                contour_ds = None
+                return None
 
-                if elevations:
-                    min_elev = min(elevations)
-                    max_elev = max(elevations)
-                    feedback.pushInfo(f'  Elevation range: {min_elev:.1f} - {max_elev:.1f}')
+            # Elevation range straight from SQLite, no Python feature loop
+            stats_lyr = contour_ds.ExecuteSQL('SELECT MIN(ELEV), MAX(ELEV) FROM contours')
+            stats_feat = stats_lyr.GetNextFeature()
+            min_elev, max_elev = stats_feat.GetField(0), stats_feat.GetField(1)
+            stats_feat = None
+            contour_ds.ReleaseResultSet(stats_lyr)
+            if min_elev is not None and max_elev is not None:
+                feedback.pushInfo(f'  Elevation range: {min_elev:.1f} - {max_elev:.1f}')
 
             # Release the layer before reprojecting
-            del contour_layer
+            contour_lyr = None
+            contour_ds = None
 
-            # Reproject to target CRS (AOI's coordinate system)
+            # Reproject to target CRS (AOI's coordinate system) while
+            # writing the final output
             feedback.pushInfo(f'  Reprojecting to {target_crs.authid()}...')
-            reprojected_shp = temp_shp.replace('_temp.shp', '_reprojected.shp')
-
-            processing.run("native:reprojectlayer", {
-                'INPUT': temp_shp,
-                'TARGET_CRS': target_crs,
-                'OUTPUT': reprojected_shp
-            }, feedback=feedback, is_child_algorithm=True)
-
-            # Clean up original temp shapefile
-            self.cleanup_shapefile(temp_shp)
 
-            # Now convert/save to final format
             if is_dxf:
-                feedback.pushInfo('  Converting to DXF format with 3D polylines...')
-                success = self.convert_to_dxf_ogr2ogr(reprojected_shp, output_path, feedback)
+                # Reproject into a second in-memory GeoPackage, then write DXF
+                reproj_path = f'/vsimem/{uuid.uuid4().hex}_reprojected.gpkg'
+                gdal.VectorTranslate(reproj_path, mem_path, options=gdal.VectorTranslateOptions(
+                    format='GPKG', dstSRS=target_crs.toWkt()
+                ))
 
-                # Clean up reprojected shapefile
-                self.cleanup_shapefile(reprojected_shp)
+                feedback.pushInfo('  Converting to DXF format with 3D polylines...')
+                success = self.convert_to_dxf(reproj_path, output_path, feedback)
 
                 if not success:
                     feedback.reportError('DXF conversion failed')
                     return None
             else:
-                # For shapefile or geopackage, just rename/move the reprojected file
                 if output_format == 'Shapefile':
-                    # Move reprojected shapefile files to final location
-                    base_src = reprojected_shp.replace('.shp', '')
-                    base_dst = output_path.replace('.shp', '')
-                    for ext in ['.shp', '.shx', '.dbf', '.prj', '.cpg']:
-                        src = base_src + ext
-                        dst = base_dst + ext
-                        if os.path.exists(src):
-                            if os.path.exists(dst):
-                                os.remove(dst)
-                            os.rename(src, dst)
+                    self.cleanup_shapefile(output_path, feedback)
+                    driver = 'ESRI Shapefile'
                 else:
-                    # GeoPackage - convert from shapefile
-                    processing.run("native:reprojectlayer", {
-                        'INPUT': reprojected_shp,
-                        'TARGET_CRS': target_crs,
-                        'OUTPUT': output_path
-                    }, feedback=feedback, is_child_algorithm=True)
-                    # Clean up reprojected shapefile
-                    self.cleanup_shapefile(reprojected_shp)
+                    try:
+                        os.remove(output_path)
+                    except FileNotFoundError:
+                        pass
+                    driver = 'GPKG'
+
+                gdal.VectorTranslate(output_path, mem_path, options=gdal.VectorTranslateOptions(
+                    format=driver, dstSRS=target_crs.toWkt()
+                ))
 
             # Verify output exists
             if os.path.exists(output_path):
@@ -808,20 +1164,22 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
             feedback.reportError(f'Error generating contours: {str(e)}')
             import traceback
             feedback.reportError(traceback.format_exc())
-            # Try to clean up temp files on error
-            try:
-                self.cleanup_shapefile(temp_shp)
-                self.cleanup_shapefile(temp_shp.replace('_temp.shp', '_reprojected.shp'))
-            except:
-                pass
             return None
 
-    def convert_to_dxf_ogr2ogr(self, input_shp, output_dxf, feedback):
+        finally:
+            # Free the in-memory intermediates whichever way we exit
+            for path in (mem_path, reproj_path, contour_dem):
+                if path.startswith('/vsimem/') and gdal.VSIStatL(path) is not None:
+                    gdal.Unlink(path)
+
+    def convert_to_dxf(self, input_path, output_dxf, feedback):
         """
-        Convert shapefile to DXF using ogr2ogr command line for reliable 3D export
+        Convert contours to DXF in-process with GDAL VectorTranslate
+
+        Same code path as ogr2ogr -zfield ELEV, without the subprocess.
 
         Args:
-            input_shp: Path to input shapefile with Z coordinates
+            input_path: Path to input contour layer (any OGR source, incl. /vsimem/)
             output_dxf: Path for output DXF file
             feedback: Processing feedback object
 
@@ -833,85 +1191,50 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
             if os.path.exists(output_dxf):
                 os.remove(output_dxf)
 
-            # Find ogr2ogr executable - check QGIS bin directory first
-            ogr2ogr_exe = None
-
-            # Try to find via QGIS paths
-            qgis_prefix = os.environ.get('QGIS_PREFIX_PATH', '')
-            if qgis_prefix:
-                potential_path = os.path.join(qgis_prefix, 'bin', 'ogr2ogr.exe')
-                if os.path.exists(potential_path):
-                    ogr2ogr_exe = potential_path
-
-            # Try common QGIS installation paths
-            if not ogr2ogr_exe:
-                common_paths = [
-                    r'C:\Program Files\QGIS 3.40.1\bin\ogr2ogr.exe',
-                    r'C:\Program Files\QGIS 3.34.14\bin\ogr2ogr.exe',
-                    r'C:\Program Files\QGIS 3.28\bin\ogr2ogr.exe',
-                    r'C:\OSGeo4W64\bin\ogr2ogr.exe',
-                    r'C:\OSGeo4W\bin\ogr2ogr.exe',
-                ]
-                for path in common_paths:
-                    if os.path.exists(path):
-                        ogr2ogr_exe = path
-                        break
-
-            if not ogr2ogr_exe:
-                feedback.pushInfo('  ogr2ogr not found, using OGR Python API...')
-                return self.convert_to_dxf_python(input_shp, output_dxf, feedback)
-
-            # Build ogr2ogr command
-            # -f DXF: output format
-            # -zfield ELEV: use ELEV field for Z values (creates proper 3D)
-            cmd = [
-                ogr2ogr_exe,
-                '-f', 'DXF',
-                output_dxf,
-                input_shp,
-                '-zfield', 'ELEV'
-            ]
-
-            feedback.pushInfo(f'  Running: {" ".join(cmd)}')
-
-            # Run ogr2ogr
-            result = subprocess.run(cmd, capture_output=True, text=True, shell=True)
-
-            if result.returncode != 0:
-                feedback.pushInfo(f'  ogr2ogr warning/error: {result.stderr}')
-                # Check if file was created despite error
-                if not os.path.exists(output_dxf):
-                    feedback.pushInfo('  Falling back to Python API...')
-                    return self.convert_to_dxf_python(input_shp, output_dxf, feedback)
+            # -zfield needs the ELEV attribute; without it fall back to the
+            # Python writer
+            src_ds = gdal.OpenEx(input_path, gdal.OF_VECTOR)
+            has_elev = src_ds.GetLayer(0).GetLayerDefn().GetFieldIndex('ELEV') >= 0
+            src_ds = None
+            if not has_elev:
+                feedback.pushInfo('  No ELEV field, using OGR Python API...')
+                return self.convert_to_dxf_python(input_path, output_dxf, feedback)
+
+            # The returned dataset is dropped right away, which flushes and closes the DXF
+            gdal.VectorTranslate(output_dxf, input_path, options=gdal.VectorTranslateOptions(
+                format='DXF', zField='ELEV'
+            ))
 
             if os.path.exists(output_dxf):
-                feedback.pushInfo('  DXF created successfully via ogr2ogr')
+                feedback.pushInfo('  DXF created successfully via GDAL')
                 return True
             else:
                 feedback.pushInfo('  DXF not created, falling back to Python API...')
-                return self.convert_to_dxf_python(input_shp, output_dxf, feedback)
+                return self.convert_to_dxf_python(input_path, output_dxf, feedback)
 
         except Exception as e:
-            feedback.pushInfo(f'  ogr2ogr error: {str(e)}, falling back to Python API...')
-            return self.convert_to_dxf_python(input_shp, output_dxf, feedback)
+            feedback.pushInfo(f'  GDAL DXF error: {str(e)}, falling back to Python API...')
+            return self.convert_to_dxf_python(input_path, output_dxf, feedback)
 
-    def convert_to_dxf_python(self, input_shp, output_dxf, feedback):
+    def convert_to_dxf_python(self, input_path, output_dxf, feedback):
         """
-        Convert shapefile to DXF using OGR Python API
+        Convert contours to DXF using OGR Python API
 
         Args:
-            input_shp: Path to input shapefile with Z coordinates
+            input_path: Path to input contour layer with Z coordinates
             output_dxf: Path for output DXF file
             feedback: Processing feedback object
 
         Returns:
             True if successful, False otherwise
         """
+        src_ds = None
+        dst_ds = None
         try:
-            # Open source shapefile
-            src_ds = ogr.Open(input_shp)
+            # Open source layer
+            src_ds = ogr.Open(input_path)
             if src_ds is None:
-                feedback.reportError(f'Could not open {input_shp}')
+                feedback.reportError(f'Could not open {input_path}')
                 return False
 
             src_layer = src_ds.GetLayer()
@@ -920,7 +1243,6 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
             drv = ogr.GetDriverByName('DXF')
             if drv is None:
                 feedback.reportError('DXF driver not available in OGR')
-                src_ds = None
                 return False
 
             # Remove existing DXF if present
@@ -931,34 +1253,42 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
             dst_ds = drv.CreateDataSource(output_dxf)
             if dst_ds is None:
                 feedback.reportError(f'Could not create {output_dxf}')
-                src_ds = None
                 return False
 
             # Create layer with 3D line string type
             dst_layer = dst_ds.CreateLayer('contours', geom_type=ogr.wkbLineString25D)
+            dst_defn = dst_layer.GetLayerDefn()
 
             # Get the ELEV field index
             layer_defn = src_layer.GetLayerDefn()
             elev_idx = layer_defn.GetFieldIndex('ELEV')
 
-            # Copy features with proper Z values
+            # Copy features with proper Z values. gdal:contour runs with
+            # CREATE_3D, so Z usually equals ELEV already; probe the first
+            # feature once and only rebuild vertices if it doesn't
             feat_count = 0
+            needs_z_rewrite = None
             src_layer.ResetReading()
 
             for src_feat in src_layer:
                 geom = src_feat.GetGeometryRef()
-                if geom is None:
+                if geom is None or geom.IsEmpty():
                     continue
 
-                # Get elevation from ELEV field
-                elev = src_feat.GetField(elev_idx) if elev_idx >= 0 else 0.0
-                if elev is None:
-                    elev = 0.0
+                # Get elevation from ELEV field (null reads as 0.0)
+                elev = src_feat.GetFieldAsDouble(elev_idx) if elev_idx >= 0 else 0.0
+
+                if needs_z_rewrite is None:
+                    first = geom.GetGeometryRef(0) if geom.GetGeometryCount() else geom
+                    first_z = first.GetZ(0) if first.GetPointCount() else None
+                    needs_z_rewrite = not geom.Is3D() or first_z != elev
 
                 # Create new geometry with proper Z values
                 geom_type = geom.GetGeometryType()
 
-                if geom_type == ogr.wkbLineString or geom_type == ogr.wkbLineString25D:
+                if not needs_z_rewrite:
+                    new_geom = geom
+                elif geom_type == ogr.wkbLineString or geom_type == ogr.wkbLineString25D:
                     new_geom = self.add_z_to_linestring(geom, elev)
                 elif geom_type == ogr.wkbMultiLineString or geom_type == ogr.wkbMultiLineString25D:
                     new_geom = ogr.Geometry(ogr.wkbMultiLineString25D)
@@ -967,19 +1297,20 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
                         new_line = self.add_z_to_linestring(line, elev)
                         new_geom.AddGeometry(new_line)
                 else:
-                    new_geom = geom.Clone()
+                    new_geom = geom
 
                 # Create new feature
-                dst_feat = ogr.Feature(dst_layer.GetLayerDefn())
-                dst_feat.SetGeometry(new_geom)
+                dst_feat = ogr.Feature(dst_defn)
+                # Geometries built above are ours to hand over; the source
+                # feature still owns geom, so that one gets copied
+                if new_geom is geom:
+                    dst_feat.SetGeometry(new_geom)
+                else:
+                    dst_feat.SetGeometryDirectly(new_geom)
                 dst_layer.CreateFeature(dst_feat)
                 dst_feat = None
                 feat_count += 1
 
-            # Cleanup
-            src_ds = None
-            dst_ds = None
-
             feedback.pushInfo(f'  Wrote {feat_count} features to DXF via Python API')
             return True
 
@@ -988,84 +1319,91 @@ class DownloadOprDemsAlgorithm(QgsProcessingAlgorithm):
             import traceback
             feedback.reportError(traceback.format_exc())
             return False
+        finally:
+            # Close both datasets so the shapefile can be deleted right away;
+            # features and geometries hold references back to their layer
+            src_feat = geom = new_geom = None
+            src_layer = None
+            dst_layer = None
+            src_ds = None
+            dst_ds = None
 
     def add_z_to_linestring(self, geom, z_value):
-        """Add Z value to all points in a linestring"""
-        new_geom = ogr.Geometry(ogr.wkbLineString25D)
-        for i in range(geom.GetPointCount()):
-            x = geom.GetX(i)
-            y = geom.GetY(i)
-            new_geom.AddPoint(x, y, z_value)
-        return new_geom
-
-    def cleanup_shapefile(self, shp_path):
-        """Remove shapefile and associated files"""
-        import gc
-        gc.collect()  # Force garbage collection to release file handles
-        time.sleep(0.1)  # Small delay to allow file handles to be released
+        """
+        Add Z value to all points in a linestring. The vertices are pulled
+        out in one GetPoints() call and the 3D line is assembled as WKB,
+        instead of three OGR calls per vertex.
+        """
+        points = geom.GetPoints()
+        if not points:
+            return ogr.Geometry(ogr.wkbLineString25D)
+
+        xyz = np.empty((len(points), 3), dtype='<f8')
+        xyz[:, :2] = np.asarray(points, dtype=np.float64)[:, :2]
+        xyz[:, 2] = z_value
+
+        # Little-endian WKB header: byte order, LineString25D type, point count
+        wkb = struct.pack('<BII', 1, ogr.wkbLineString25D & 0xFFFFFFFF, len(points)) + xyz.tobytes()
+        return ogr.CreateGeometryFromWkb(wkb)
 
+    def cleanup_shapefile(self, shp_path, feedback=None):
+        """
+        Remove shapefile and associated files (callers close their datasets first).
+        On Windows QGIS or antivirus may still hold a previous run's files, so
+        locked files are retried a few times before warning.
+        """
         base = shp_path.replace('.shp', '')
         # Include all possible shapefile sidecar files
         extensions = ['.shp', '.shx', '.dbf', '.prj', '.cpg', '.qix', '.sbn', '.sbx', '.fbn', '.fbx', '.ain', '.aih', '.atx', '.ixs', '.mxs', '.xml']
         for ext in extensions:
-            f = base + ext
-            if os.path.exists(f):
+            # Most sidecars never exist, so let remove() report that
+            # instead of stat'ing first
+            for attempt in range(3):
                 try:
-                    os.remove(f)
-                except Exception:
-                    # Try again after a brief pause
-                    time.sleep(0.2)
-                    try:
-                        os.remove(f)
-                    except Exception:
-                        pass  # Give up silently
-
-    def convert_dem_to_feet(self, raster_path, feedback):
-        """Convert DEM elevations from meters to feet (multiply by 3.28084)"""
-
-        METERS_TO_FEET = 3.28084
-
-        # Open the raster
-        ds = gdal.Open(raster_path, gdal.GA_Update)
-        if not ds:
-            feedback.reportError(f'Could not open {raster_path} for conversion')
-            return
-
-        band = ds.GetRasterBand(1)
-
-        # Get raster dimensions
-        xsize = ds.RasterXSize
-        ysize = ds.RasterYSize
-
-        # Process in chunks to handle large rasters
-        chunk_size = 1024
-
-        for y in range(0, ysize, chunk_size):
-            # Calculate chunk height
-            if y + chunk_size < ysize:
-                rows = chunk_size
-            else:
-                rows = ysize - y
-
-            for x in range(0, xsize, chunk_size):
-                # Calculate chunk width
-                if x + chunk_size < xsize:
-                    cols = chunk_size
-                else:
-                    cols = xsize - x
-
-                # Read chunk
-                data = band.ReadAsArray(x, y, cols, rows)
-
-                if data is not None:
-                    # Convert meters to feet
-                    data = data * METERS_TO_FEET
-
-                    # Write back
-                    band.WriteArray(data, x, y)
-
-        # Flush cache and close
-        band.FlushCache()
-        ds = None
-
-        feedback.pushInfo(f'  Converted to feet (multiplied by {METERS_TO_FEET})')
+                    os.remove(base + ext)
+                    break
+                except FileNotFoundError:
+                    break
+                except OSError as e:
+                    if attempt < 2:
+                        time.sleep(0.2 * (attempt + 1))
+                    elif feedback:
+                        feedback.pushWarning(f'Could not delete {base + ext}: {e}')
+
+    @contextmanager
+    def gdal_config(self, **options):
+        """Set GDAL config options for the duration of a block, then restore them"""
+        previous = {key: gdal.GetConfigOption(key) for key in options}
+        for key, value in options.items():
+            gdal.SetConfigOption(key, value)
+        try:
+            yield
+        finally:
+            for key, value in previous.items():
+                gdal.SetConfigOption(key, value)
+
+    @contextmanager
+    def gdal_cache_max(self, size):
+        """Raise the GDAL block cache to at least size bytes for a block, then restore it"""
+        previous = gdal.GetCacheMax()
+        gdal.SetCacheMax(max(previous, size))
+        try:
+            yield
+        finally:
+            gdal.SetCacheMax(previous)
+
+    def scale_vrt(self, vrt_ds, ratio):
+        """Return a copy of an in-memory VRT whose sources are multiplied by ratio as they are read"""
+
+        # ComplexSource ScaleRatio is applied inside GDAL's read path and
+        # leaves source NODATA pixels untouched
+        root = ElementTree.fromstring(vrt_ds.GetMetadata('xml:VRT')[0])
+        for band in root.iter('VRTRasterBand'):
+            band.set('dataType', 'Float32')
+            for source in band:
+                if source.tag in ('SimpleSource', 'ComplexSource'):
+                    source.tag = 'ComplexSource'
+                    ElementTree.SubElement(source, 'ScaleRatio').text = str(ratio)
+
+        # The VRT driver opens XML passed in place of a filename
+        return gdal.Open(ElementTree.tostring(root, encoding='unicode'))